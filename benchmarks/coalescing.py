@@ -0,0 +1,102 @@
+# benchmarks/coalescing.py
+#
+# Multi-session request coalescing benchmark: several dashboard sessions of
+# the same account load the page at the same moment with cold caches, as when
+# a team opens the dashboard together or a cache entry expires under load.
+# Each session is a thread running the dashboard's page fetch (the devices and
+# statuses reads, through the cache). AppTest is not used here: concurrent
+# AppTests share one mocked Streamlit runtime and tear it down under each other.
+# Reports the backend requests each round costs with and without the
+# process-wide request coalescer.
+#
+#   python -m benchmarks.coalescing --sessions 8 --rounds 10 --devices 1000 --latency 0.05
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+from benchmarks.mock_backend import MockBackend, make_token, start_server
+from benchmarks.run_benchmarks import (BENCH_MOBILE, ROOT_DIR, clear_caches, isolate_stores, percentile,
+                                      print_table)
+
+
+# Function to run `rounds` rounds in which every session loads the page at once on a cold cache
+def bench_sessions(backend, sessions, rounds, coalesce):
+    from modules import cache
+    from modules.fetch import fetch_concurrently
+    cache.COALESCE_ENABLED = coalesce
+    jwt_token = make_token(BENCH_MOBILE)  # One login shared by every session, as with one team account
+
+    barrier = threading.Barrier(sessions + 1)
+    errors = []
+
+    def load_page():
+        barrier.wait()
+        page_data = fetch_concurrently({
+            'devices': (cache.cached_iot_devices, (BENCH_MOBILE, jwt_token)),
+            'statuses': (cache.cached_device_status, (BENCH_MOBILE, jwt_token)),
+        })
+        errors.extend(page_data['errors'].values())
+
+    timings, request_counts = [], []
+    for _ in range(rounds):
+        clear_caches()
+        backend.reset_counters()
+        threads = [threading.Thread(target=load_page) for _ in range(sessions)]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        started_at = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        timings.append(time.perf_counter() - started_at)
+        request_counts.append(sum(backend.reset_counters().values()))
+        if errors:
+            raise RuntimeError(f"Page fetch failed: {errors[0]}")
+
+    return {
+        'sessions': sessions,
+        'coalescing': 'on' if coalesce else 'off',
+        'rounds': rounds,
+        'requests_per_round': round(sum(request_counts) / rounds, 2),
+        'requests_per_session': round(sum(request_counts) / rounds / sessions, 2),
+        'p50_ms': round(percentile(timings, 50) * 1000, 1),
+        'p95_ms': round(percentile(timings, 95) * 1000, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure backend requests of concurrent sessions with and without coalescing')
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 4, 16, 64], help='concurrent sessions to test')
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--devices', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.05, help='mock backend latency per request, seconds')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args(argv)
+
+    backend = MockBackend(devices=args.devices, latency=args.latency)
+    server, root_url = start_server(backend)
+    # Must be set before modules.utils is imported
+    os.environ['MANAGERR_API_ROOT_URL'] = root_url
+    isolate_stores()
+    sys.path.insert(0, ROOT_DIR)
+
+    results = []
+    try:
+        for sessions in args.sessions:
+            for coalesce in (False, True):
+                results.append(bench_sessions(backend, sessions, args.rounds, coalesce))
+    finally:
+        server.shutdown()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results, ('sessions', 'coalescing', 'rounds', 'requests_per_round', 'requests_per_session', 'p50_ms', 'p95_ms'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+# benchmarks/mock_backend.py
+#
+# Local stand-in for the Robo Rakhwala API, for benchmarks and offline work.
+#
+#   python -m benchmarks.mock_backend --devices 1000 --latency 0.05 --error-rate 0.01
+#   MANAGERR_API_ROOT_URL=http://127.0.0.1:8765/v1api/ streamlit run main.py
+
+import argparse
+import base64
+from collections import Counter
+import gzip
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import threading
+import time
+
+DEFAULT_PASSWORD = 'password'
+TOKEN_LIFETIME = 3600
+
+
+# Function to build an unsigned JWT-shaped token carrying the user and expiry
+def make_token(mobile, lifetime=TOKEN_LIFETIME):
+    def encode(data):
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).rstrip(b'=').decode()
+    claims = {'sub': mobile, 'iat': int(time.time()), 'exp': int(time.time()) + lifetime}
+    return f"{encode({'alg': 'none', 'typ': 'JWT'})}.{encode(claims)}.mock"
+
+# Function to tell whether a token from make_token has expired (malformed tokens count as expired)
+def token_expired(token):
+    try:
+        claims = token.split('.')[1]
+        claims = json.loads(base64.urlsafe_b64decode(claims + '=' * (-len(claims) % 4)))
+        return claims['exp'] <= time.time()
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+        return True
+
+
+# Fake backend state: one fleet per user, request counters and fault settings
+class MockBackend:
+    def __init__(self, devices=100, latency=0.0, jitter=0.0, error_rate=0.0, started_ratio=0.5, seed=0,
+                 token_lifetime=TOKEN_LIFETIME):
+        self.device_count = devices
+        self.token_lifetime = token_lifetime
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.started_ratio = started_ratio
+        self.random = random.Random(seed)
+        self.users = {}  # mobile -> password
+        self.fleets = {}  # mobile -> {'devices': [...], 'actions': {...}, 'version': int}
+        self.requests = Counter()
+        self.lock = threading.Lock()
+
+    def fleet(self, mobile):
+        with self.lock:
+            if mobile not in self.fleets:
+                devices = [{'id': f'dev-{i:05d}', 'device_label': f'Unit {i}'} for i in range(self.device_count)]
+                actions = {device['id']: 'STARTED' if self.random.random() < self.started_ratio else 'STOPPED'
+                           for device in devices}
+                self.fleets[mobile] = {'devices': devices, 'actions': actions, 'version': 0}
+            return self.fleets[mobile]
+
+    def reset_counters(self):
+        with self.lock:
+            counts = dict(self.requests)
+            self.requests.clear()
+        return counts
+
+    # Returns (status_code, body, extra_headers) for one API call
+    def handle(self, endpoint, payload, headers):
+        with self.lock:
+            self.requests[endpoint] += 1
+        if self.latency or self.jitter:
+            time.sleep(max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter)))
+        if self.error_rate and self.random.random() < self.error_rate:
+            return 503, {'success': False, 'message': 'Injected error'}, {}
+
+        if endpoint == 'validate_user':
+            mobile = payload.get('mobile')
+            if self.users.get(mobile, DEFAULT_PASSWORD) != payload.get('password'):
+                return 401, {'success': False, 'message': 'Invalid credentials'}, {}
+            return 200, {'success': True, 'jwt_token': make_token(mobile, self.token_lifetime)}, {}
+
+        if endpoint == 'user_registry':
+            self.users[payload.get('mobile')] = payload.get('password')
+            return 200, {'success': True, 'message': 'Registered'}, {}
+
+        if not payload.get('jwt_token'):
+            return 401, {'success': False, 'message': 'Missing token'}, {}
+        if token_expired(payload['jwt_token']):
+            return 401, {'success': False, 'message': 'Token expired'}, {}
+        fleet = self.fleet(payload.get('user_login_id'))
+
+        if endpoint == 'get_user_profile_details':
+            return 200, fleet['devices'], {}
+
+        if endpoint == 'get_task':
+            etag = f'"{fleet["version"]}"'
+            if headers.get('If-None-Match') == etag:
+                return 304, None, {'ETag': etag}
+            statuses = [{'id': device_id, 'action': action} for device_id, action in fleet['actions'].items()]
+            return 200, statuses, {'ETag': etag}
+
+        if endpoint == 'update_task':
+            device_id = payload.get('id')
+            if device_id not in fleet['actions']:
+                return 404, {'success': False, 'message': 'Unknown device'}, {}
+            with self.lock:
+                fleet['actions'][device_id] = 'STARTED' if payload.get('duration', 0) > 0 else 'STOPPED'
+                fleet['version'] += 1
+            return 200, {'success': True, 'message': f'Task updated for {device_id}'}, {}
+
+        return 404, {'success': False, 'message': 'Unknown endpoint'}, {}
+
+
+# Function to build the HTTP request handler bound to a backend
+def make_handler(backend):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # Keep-alive, like the real API
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            try:
+                payload = json.loads(self.rfile.read(length) or b'{}')
+            except ValueError:
+                payload = {}
+            endpoint = self.path.rstrip('/').rsplit('/', 1)[-1]
+            status, body, extra_headers = backend.handle(endpoint, payload, self.headers)
+            data = b'' if body is None else json.dumps(body).encode()
+            compressed = len(data) > 1024 and 'gzip' in (self.headers.get('Accept-Encoding') or '')
+            if compressed:
+                data = gzip.compress(data, compresslevel=5)
+
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            if compressed:
+                self.send_header('Content-Encoding', 'gzip')
+            self.send_header('Content-Length', str(len(data)))
+            for name, value in extra_headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+# Function to start the mock backend on a background thread; returns (server, root_url)
+def start_server(backend, host='127.0.0.1', port=0):
+    server = ThreadingHTTPServer((host, port), make_handler(backend))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='mock-backend', daemon=True).start()
+    return server, f'http://{host}:{server.server_address[1]}/v1api/'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a local mock of the Robo Rakhwala API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--devices', type=int, default=100, help='devices per account')
+    parser.add_argument('--latency', type=float, default=0.0, help='added latency per request, seconds')
+    parser.add_argument('--jitter', type=float, default=0.0, help='random +/- latency, seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with 503')
+    parser.add_argument('--token-lifetime', type=int, default=TOKEN_LIFETIME, help='seconds until issued tokens expire')
+    args = parser.parse_args()
+
+    backend = MockBackend(args.devices, args.latency, args.jitter, args.error_rate, token_lifetime=args.token_lifetime)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(backend))
+    print(f'Mock backend on http://{args.host}:{args.port}/v1api/ with {args.devices} devices per account')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
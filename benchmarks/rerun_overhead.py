@@ -0,0 +1,93 @@
+# benchmarks/rerun_overhead.py
+#
+# Per-rerun overhead microbenchmark: how much an idle, logged-in dashboard
+# (warm caches, no clicks) costs on each Streamlit rerun on top of an empty
+# script, plus the one-off import cost of the app modules in a fresh process.
+#
+#   python -m benchmarks.rerun_overhead --devices 100 --reruns 50 --budget-ms 150
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.mock_backend import MockBackend, make_token, start_server
+from benchmarks.run_benchmarks import APP_FILE, BENCH_MOBILE, ROOT_DIR, isolate_stores, percentile
+
+# Modules whose first import is timed in a fresh interpreter
+IMPORT_TARGETS = ['modules.app', 'modules.login', 'modules.iot_device']
+
+
+# Function to time `reruns` reruns of an AppTest; returns the durations in seconds
+def time_reruns(app, reruns):
+    app.run()  # Warm-up
+    if app.exception:
+        raise RuntimeError(f"App raised during warm-up: {app.exception[0].message}")
+    timings = []
+    for _ in range(reruns):
+        started_at = time.perf_counter()
+        app.run()
+        timings.append(time.perf_counter() - started_at)
+    return timings
+
+# Function to time the first import of a module in a fresh interpreter
+def import_time(module):
+    code = f'import time; started_at = time.perf_counter(); import {module}; print(time.perf_counter() - started_at)'
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure the per-rerun overhead of an idle dashboard')
+    parser.add_argument('--devices', type=int, default=100)
+    parser.add_argument('--reruns', type=int, default=50)
+    parser.add_argument('--budget-ms', type=float, default=None, help='fail (exit 1) if the p50 overhead exceeds this')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args(argv)
+
+    backend = MockBackend(devices=args.devices)
+    server, root_url = start_server(backend)
+    os.environ['MANAGERR_API_ROOT_URL'] = root_url  # Must be set before the app imports modules.utils
+    isolate_stores()
+    sys.path.insert(0, ROOT_DIR)
+    from streamlit.testing.v1 import AppTest
+
+    try:
+        baseline = time_reruns(AppTest.from_string('import streamlit as st'), args.reruns)
+
+        app = AppTest.from_file(APP_FILE, default_timeout=60)
+        app.session_state['mobile'] = BENCH_MOBILE
+        app.session_state['jwt_token'] = make_token(BENCH_MOBILE)
+        backend.reset_counters()
+        dashboard = time_reruns(app, args.reruns)
+        requests_per_rerun = (sum(backend.reset_counters().values()) - 2) / args.reruns  # Minus the warm-up fetch
+    finally:
+        server.shutdown()
+
+    result = {
+        'devices': args.devices,
+        'reruns': args.reruns,
+        'baseline_p50_ms': round(percentile(baseline, 50) * 1000, 2),
+        'dashboard_p50_ms': round(percentile(dashboard, 50) * 1000, 2),
+        'dashboard_p95_ms': round(percentile(dashboard, 95) * 1000, 2),
+        'overhead_p50_ms': round((percentile(dashboard, 50) - percentile(baseline, 50)) * 1000, 2),
+        'requests_per_rerun': round(requests_per_rerun, 2),
+        'import_ms': {module: round(import_time(module) * 1000, 1) for module in IMPORT_TARGETS},
+    }
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        for name, value in result.items():
+            print(f'{name:>20}  {value}')
+
+    if args.budget_ms is not None and result['overhead_p50_ms'] > args.budget_ms:
+        print(f'Over budget: {result["overhead_p50_ms"]} ms > {args.budget_ms} ms', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,179 @@
+# benchmarks/run_benchmarks.py
+#
+# End-to-end rerun latency benchmark. Starts the mock backend, logs a session
+# in and drives main.py headlessly with Streamlit's AppTest.
+#
+#   python -m benchmarks.run_benchmarks --sizes 10 100 1000 10000 --reruns 20 --latency 0.02
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.mock_backend import MockBackend, make_token, start_server
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_FILE = os.path.join(ROOT_DIR, 'main.py')
+BENCH_MOBILE = '9000000000'
+
+
+# Function to compute a percentile (nearest-rank) of a list of numbers
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+# Function to point the app's snapshot and job databases at a throwaway
+# directory, so a run neither reads nor writes the real ~/.managerr stores.
+# Must be called before the app modules are imported.
+def isolate_stores():
+    directory = tempfile.mkdtemp(prefix='managerr-bench-')
+    os.environ['MANAGERR_SNAPSHOT_DB'] = os.path.join(directory, 'snapshots.db')
+    os.environ['MANAGERR_JOBS_DB'] = os.path.join(directory, 'jobs.db')
+
+
+# Function to drop every process-wide cache, and the benchmark account's saved
+# snapshot, so a rerun has to hit the backend
+def clear_caches():
+    from modules import cache, snapshot_store
+    cache.api_cache.clear()
+    cache.status_polls.clear()
+    cache.request_coalescer.clear()
+    snapshot_store.delete_snapshot(BENCH_MOBILE)
+
+
+# Function to time `reruns` reruns of a logged-in dashboard session
+def bench_reruns(backend, size, reruns, cold, timeout):
+    from streamlit.testing.v1 import AppTest
+
+    backend.device_count = size
+    backend.fleets.clear()
+    clear_caches()
+
+    app = AppTest.from_file(APP_FILE, default_timeout=timeout)
+    app.session_state['show_registration_page'] = False
+    app.session_state['mobile'] = BENCH_MOBILE
+    app.session_state['jwt_token'] = make_token(BENCH_MOBILE)
+    app.run()  # Warm-up: imports, first fetch, first render
+    if app.exception:
+        raise RuntimeError(f"App raised during warm-up: {app.exception[0].message}")
+
+    timings, request_counts, peaks = [], [], []
+    for _ in range(reruns):
+        if cold:
+            clear_caches()
+        backend.reset_counters()
+        tracemalloc.start()
+        started_at = time.perf_counter()
+        app.run()
+        timings.append(time.perf_counter() - started_at)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        request_counts.append(sum(backend.reset_counters().values()))
+
+    return {
+        'devices': size,
+        'cache': 'cold' if cold else 'warm',
+        'reruns': reruns,
+        'p50_ms': round(percentile(timings, 50) * 1000, 1),
+        'p95_ms': round(percentile(timings, 95) * 1000, 1),
+        'requests_per_rerun': round(sum(request_counts) / len(request_counts), 2),
+        'peak_mem_mb': round(max(peaks) / 2 ** 20, 2),
+    }
+
+
+# Function to time decoding a device list of `size` records with each available
+# decoder, and measure the peak memory of decoding plus keeping the result
+def bench_parsing(size, repeats):
+    from modules import decoding
+    from modules.fleet import Device
+
+    raw = json.dumps([{'id': f'dev-{i:05d}', 'device_label': f'Unit {i}'} for i in range(size)]).encode()
+    chunk_size = decoding.STREAM_CHUNK_SIZE
+    decoders = {'json': lambda: [Device.from_dict(record) for record in json.loads(raw)]}
+    if decoding.orjson is not None:
+        decoders['orjson'] = lambda: [Device.from_dict(record) for record in decoding.orjson.loads(raw)]
+    decoders['stream'] = lambda: [Device.from_dict(record) for record in decoding.iter_json_array(
+        raw[start:start + chunk_size] for start in range(0, len(raw), chunk_size))]
+
+    results = []
+    for name, decode in decoders.items():
+        timings = []
+        for _ in range(repeats):
+            started_at = time.perf_counter()
+            decode()
+            timings.append(time.perf_counter() - started_at)
+        tracemalloc.start()
+        devices = decode()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        del devices
+        results.append({
+            'devices': size,
+            'decoder': name,
+            'body_kb': round(len(raw) / 1024, 1),
+            'gzip_kb': round(len(gzip.compress(raw, compresslevel=5)) / 1024, 1),
+            'parse_p50_ms': round(percentile(timings, 50) * 1000, 2),
+            'peak_mem_mb': round(peak / 2 ** 20, 2),
+        })
+    return results
+
+
+# Function to print results as an aligned table
+def print_table(results, columns=('devices', 'cache', 'reruns', 'p50_ms', 'p95_ms', 'requests_per_rerun', 'peak_mem_mb')):
+    widths = {column: max(len(column), *(len(str(row[column])) for row in results)) for column in columns}
+    print('  '.join(column.rjust(widths[column]) for column in columns))
+    for row in results:
+        print('  '.join(str(row[column]).rjust(widths[column]) for column in columns))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark dashboard rerun latency against the mock backend')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000], help='fleet sizes to test')
+    parser.add_argument('--reruns', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.02, help='mock backend latency per request, seconds')
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--timeout', type=float, default=120, help='seconds allowed per rerun')
+    parser.add_argument('--parse-repeats', type=int, default=5, help='timed decodes per fleet size and decoder (0 to skip)')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args(argv)
+
+    backend = MockBackend(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate)
+    server, root_url = start_server(backend)
+    # Must be set before the app imports modules.utils
+    os.environ['MANAGERR_API_ROOT_URL'] = root_url
+    isolate_stores()
+    sys.path.insert(0, ROOT_DIR)
+
+    results = []
+    try:
+        for size in args.sizes:
+            for cold in (True, False):
+                results.append(bench_reruns(backend, size, args.reruns, cold, args.timeout))
+    finally:
+        server.shutdown()
+
+    parse_results = []
+    if args.parse_repeats > 0:
+        for size in args.sizes:
+            parse_results.extend(bench_parsing(size, args.parse_repeats))
+
+    if args.json:
+        print(json.dumps({'reruns': results, 'parsing': parse_results}, indent=2))
+    else:
+        print_table(results)
+        if parse_results:
+            print()
+            print_table(parse_results, ('devices', 'decoder', 'body_kb', 'gzip_kb', 'parse_p50_ms', 'peak_mem_mb'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,8 @@
+# cli.py
+
+import sys
+from modules.cli import main
+
+# Run the command-line interface (see modules/cli.py for usage)
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+# modules/accounts.py
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import os
+import threading
+import time
+
+from modules.cache import cached_iot_devices, cached_device_status
+from modules.fetch import is_error_response
+from modules.fleet import Fleet
+from modules.history import status_history
+
+# Maximum number of API calls in flight across all accounts of a fleet refresh
+ACCOUNTS_MAX_WORKERS = int(os.environ.get('MANAGERR_ACCOUNTS_WORKERS', 8))
+
+# How long a fleet refresh waits for slow accounts before reporting them as timed out
+ACCOUNTS_FETCH_TIMEOUT = float(os.environ.get('MANAGERR_ACCOUNTS_TIMEOUT', 5))
+
+# Calls still running, per (mobile, jwt_token, kind): a rerun (or another session)
+# reuses them instead of queueing another call behind a slow account
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+
+# Function to get the bounded pool shared by multi-account fetches; it is
+# separate from the page fetch pool so a large fleet cannot starve single-account pages
+@lru_cache(maxsize=None)
+def get_accounts_executor():
+    return ThreadPoolExecutor(max_workers=ACCOUNTS_MAX_WORKERS, thread_name_prefix='managerr-accounts')
+
+# Function to call an API helper and time it; exceptions become error dicts
+def _timed_call(func, *args):
+    started = time.perf_counter()
+    try:
+        response = func(*args)
+    except Exception as e:
+        response = {"success": False, "message": f"API request failed: {str(e)}"}
+    return response, time.perf_counter() - started
+
+# Function to submit one account read, or join the same read still in flight
+def _submit(kind, func, mobile, jwt_token):
+    key = (mobile, jwt_token, kind)
+    with _in_flight_lock:
+        future = _in_flight.get(key)
+        submitted = future is None
+        if submitted:
+            future = _in_flight[key] = get_accounts_executor().submit(_timed_call, func, mobile, jwt_token)
+            future.submitted_at = time.monotonic()
+    if submitted:
+        # Outside the lock: the callback runs at once if the call already finished
+        future.add_done_callback(lambda f: _forget(key, f))
+    return future
+
+def _forget(key, future):
+    with _in_flight_lock:
+        if _in_flight.get(key) is future:
+            del _in_flight[key]
+
+# Function to start fetching the devices and statuses of several accounts
+# (mobile -> jwt_token) without waiting; returns {(mobile, kind): future}
+def submit_account_fetches(accounts):
+    futures = {}
+    for mobile, jwt_token in accounts.items():
+        futures[(mobile, 'devices')] = _submit('devices', cached_iot_devices, mobile, jwt_token)
+        futures[(mobile, 'statuses')] = _submit('statuses', cached_device_status, mobile, jwt_token)
+    return futures
+
+# Function to build (fleet, health) from the account fetches as they stand now.
+# The fleet merges every account that answered, keyed by (mobile, device_id);
+# health holds per account {'ok', 'loading', 'timed_out', 'devices', 'running', 'latency', 'message'}.
+# An account is 'loading' until its calls have run for `timeout` seconds (or at
+# once if it is in `given_up`), then reported as timed out; a failed or slow
+# account is left out of the fleet and never holds up the others.
+# Fresh statuses are also recorded in the status history.
+def collect_accounts(accounts, futures, timeout=ACCOUNTS_FETCH_TIMEOUT, given_up=()):
+    now = time.monotonic()
+    responses = {}
+    health = {}
+    for mobile in accounts:
+        results = {}
+        message = None
+        loading = timed_out = False
+        latency = 0.0
+        for kind in ('devices', 'statuses'):
+            future = futures[(mobile, kind)]
+            if not future.done():
+                if now - future.submitted_at >= timeout or mobile in given_up:
+                    timed_out = True
+                    message = f"Timed out after {timeout:g}s"
+                else:
+                    loading = True
+                continue
+            response, seconds = future.result()
+            latency = max(latency, seconds)
+            if is_error_response(response):
+                message = message or response.get('message', 'Request failed')
+            elif not isinstance(response, list):
+                message = message or f"Unexpected {kind} response"
+            else:
+                results[kind] = response
+
+        ok = message is None and not loading
+        if ok:
+            responses[mobile] = (results['devices'], results['statuses'])
+            status_history.record(mobile, results['statuses'])
+        health[mobile] = {
+            'ok': ok,
+            'loading': loading and message is None,
+            'timed_out': timed_out,
+            'devices': len(results['devices']) if 'devices' in results else None,
+            'running': sum(status.get('action') == 'STARTED' for status in results['statuses']) if ok else None,
+            'latency': latency,
+            'message': message,
+        }
+    return Fleet.merge(responses), health
@@ -0,0 +1,94 @@
+# modules/app.py
+#
+# The app itself. Streamlit re-executes the entry script (streamlit_app.py or
+# main.py) on every interaction, so those files only import this module:
+# everything here is built once per process, when it is first imported.
+
+import streamlit as st
+
+from modules.diagnostics import diagnostics_sidebar
+from modules.metrics import timed_page
+
+# Styles for the custom HTML elements of the pages, built once per process
+APP_CSS = """
+<style>
+.loader {
+    border: 16px solid #f3f3f3;
+    border-radius: 50%;
+    border-top: 16px solid #3498db;
+    width: 120px;
+    height: 120px;
+    animation: spin 2s linear infinite;
+    margin: auto;
+    position: absolute;
+    top: 50%;
+    left: 50%;
+    transform: translate(-50%, -50%);
+}
+@keyframes spin {
+    0% { transform: translate(-50%, -50%) rotate(0deg); }
+    100% { transform: translate(-50%, -50%) rotate(360deg); }
+}
+.button {
+    background-color: #3498db; /* Blue */
+    border: none;
+    color: white;
+    padding: 10px 20px;
+    text-align: center;
+    text-decoration: none;
+    display: inline-block;
+    font-size: 16px;
+    margin: 4px 2px;
+    cursor: pointer;
+    border-radius: 5px;
+    transition: background-color 0.3s;
+}
+.button:hover {
+    background-color: #2980b9; /* Darker blue */
+}
+.device-name {
+    font-weight: bold;
+    margin: 5px 0;
+}
+.device-status {
+    font-size: 14px;
+    color: #555;
+}
+</style>
+"""
+
+# Function to inject the app styles. Streamlit drops every element a rerun does
+# not emit again, so this runs once per rerun; a style-only st.html call is
+# sent without adding a block to the page layout.
+def inject_styles():
+    st.html(APP_CSS)
+
+# Main function to manage session state and display relevant content.
+# Page modules are imported on first use, so the login page does not pay for
+# the dashboard's dependencies (numpy, the async client...).
+@timed_page
+def main():
+    # Scheduled jobs run whichever page is open, even with no session at all;
+    # the worker thread starts on the first run in this process
+    from modules.job_queue import ensure_worker
+    ensure_worker()
+    st.session_state.setdefault('show_registration_page', False)
+    inject_styles()
+
+    # If user is not logged in, show the login page or registration page
+    if 'jwt_token' not in st.session_state:
+        from modules.login import login_page, registration_page
+        if st.session_state['show_registration_page']:
+            registration_page()
+        else:
+            login_page()
+    # If logged in, show the IoT device list page, or every added account in fleet mode
+    elif st.sidebar.toggle("Fleet mode", key='fleet_mode', help="Manage several accounts at once"):
+        from modules.fleet_dashboard import fleet_dashboard_page
+        fleet_dashboard_page()
+    else:
+        from modules.iot_device import iot_device_page
+        iot_device_page()
+
+    # Opt-in timing data for the API layer and page renders
+    diagnostics_sidebar()
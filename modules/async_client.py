@@ -0,0 +1,171 @@
+# modules/async_client.py
+
+import asyncio
+from functools import lru_cache
+import os
+import threading
+import time
+
+import aiohttp
+
+from modules import metrics, resilience
+from modules.decoding import loads
+from modules.utils import (API_ROOT_URL, API_CONNECT_TIMEOUT, API_READ_TIMEOUT, API_RETRY_BACKOFF, RETRY_STATUS_CODES,
+                           auth_request, endpoint_name, error_result, read_fallback, read_result, record_attempt,
+                           request_policy)
+
+# Maximum number of open connections held by the asyncio client
+ASYNC_MAX_CONNECTIONS = int(os.environ.get('MANAGERR_ASYNC_MAX_CONNECTIONS', 100))
+
+# Default number of requests one fan-out keeps in flight
+ASYNC_MAX_IN_FLIGHT = int(os.environ.get('MANAGERR_ASYNC_MAX_IN_FLIGHT', 50))
+
+_session = None
+
+
+# Function to start the process-wide event loop on a daemon thread.
+# Every coroutine in this module runs on that loop, so one connection
+# pool serves all Streamlit sessions in the server process.
+@lru_cache(maxsize=None)
+def get_event_loop():
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name='managerr-asyncio', daemon=True).start()
+    return loop
+
+# Function to run a coroutine on the shared loop from synchronous code
+def run(coro, timeout=None):
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop()).result(timeout)
+
+# Function to get the shared aiohttp session; only called on the shared loop
+async def get_client_session():
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=ASYNC_MAX_CONNECTIONS),
+            timeout=aiohttp.ClientTimeout(sock_connect=API_CONNECT_TIMEOUT, sock_read=API_READ_TIMEOUT),
+        )
+    return _session
+
+# Function to POST and read the JSON body. Returns (status_code, body), the
+# body decoded only for a 200. Follows the sync client's policy (utils.api_post):
+# circuit breaker, adaptive read deadline, and retries and hedging for
+# idempotent reads only.
+async def api_post(url, payload, headers=None, idempotent=False):
+    session = await get_client_session()
+    endpoint = endpoint_name(url)
+    breaker, read_timeout, attempts = request_policy(endpoint, idempotent)
+    timeout = aiohttp.ClientTimeout(sock_connect=API_CONNECT_TIMEOUT, sock_read=read_timeout)
+
+    async def send():
+        started_at = time.perf_counter()
+        try:
+            async with session.post(url, json=payload, headers=headers, timeout=timeout) as response:
+                body = loads(await response.read()) if response.status == 200 else None
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            record_attempt(endpoint, time.perf_counter() - started_at, 'error')
+            raise
+        record_attempt(endpoint, time.perf_counter() - started_at, response.status)
+        return response.status, body
+
+    healthy = False
+    try:
+        for attempt in range(attempts):
+            last_attempt = attempt == attempts - 1
+            try:
+                if idempotent and resilience.HEDGE_ENABLED:
+                    status_code, body = await resilience.hedged_async(send, resilience.hedge_delay(endpoint),
+                                                                       budget=resilience.get_hedge_budget(endpoint))
+                else:
+                    status_code, body = await send()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if last_attempt:
+                    raise
+            else:
+                if status_code not in RETRY_STATUS_CODES or last_attempt:
+                    healthy = status_code < 500
+                    return status_code, body
+            if metrics.enabled:
+                metrics.record_retry(endpoint)
+            await asyncio.sleep(API_RETRY_BACKOFF * (2 ** attempt))
+    finally:
+        if healthy:
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+
+# Coroutine to make the login API call
+async def login_api_call(mobile, password):
+    try:
+        url = f'{API_ROOT_URL}/validate_user'
+        payload = {'mobile': mobile, 'password': password}
+        status_code, body = await api_post(url, payload)
+
+        if status_code == 200:
+            return body  # Assuming the API returns a jwt_token on success
+        else:
+            return {"success": False, "message": "Invalid mobile number or password"}
+    except Exception as e:
+        return {"success": False, "message": f"API request failed: {str(e)}"}
+
+# Coroutine to call the user registration API
+async def user_registry(mobile, password, confirm_password):
+    if password != confirm_password:
+        return {"success": False, "message": "Passwords do not match"}
+
+    try:
+        url = f'{API_ROOT_URL}/user_registry'
+        payload = {'mobile': mobile, 'password': password, 'confirm_password': confirm_password}
+        status_code, body = await api_post(url, payload)
+
+        if status_code == 200:
+            return body  # Assuming the API returns a success message
+        else:
+            return {"success": False, "message": "Registration failed"}
+    except Exception as e:
+        return {"success": False, "message": f"API request failed: {str(e)}"}
+
+# Coroutine to fetch a token-authenticated list endpoint; results, errors and
+# the snapshot fallback are the same as the sync helpers'
+async def _read_list(endpoint, mobile, jwt_token, failure_message):
+    try:
+        url, payload, headers = auth_request(endpoint, mobile, jwt_token)
+        status_code, body = await api_post(url, payload, headers=headers, idempotent=True)
+        return read_result(endpoint, mobile, jwt_token, status_code, body, failure_message)
+    except Exception as e:
+        return read_fallback(endpoint, mobile, jwt_token, e)
+
+# Coroutine to fetch IoT devices
+async def get_iot_devices(mobile, jwt_token):
+    return await _read_list('get_user_profile_details', mobile, jwt_token, "Failed to fetch IoT devices")
+
+# Coroutine to get device statuses
+async def get_device_status(mobile, jwt_token):
+    return await _read_list('get_task', mobile, jwt_token, "Failed to fetch device statuses")
+
+# Coroutine to update the task (start/stop based on duration)
+async def update_task(device_id, jwt_token, mobile, duration):
+    try:
+        # Duration > 0 = start, duration = 0 = stop
+        url, payload, headers = auth_request('update_task', mobile, jwt_token, id=device_id, duration=duration)
+        status_code, body = await api_post(url, payload, headers=headers)
+
+        if status_code == 200:
+            return body  # Return the response containing the message
+        return error_result(status_code, "Failed to execute device command")
+    except Exception as e:
+        return {"success": False, "message": f"API request failed: {str(e)}"}
+
+# Coroutine to run many coroutine calls with at most `max_in_flight` at once.
+# `calls` is a list of (coroutine_function, args); results keep the same order.
+# `on_result(index, result)` is called on the loop thread as each call finishes.
+async def gather_bounded(calls, max_in_flight=ASYNC_MAX_IN_FLIGHT, on_result=None):
+    semaphore = asyncio.Semaphore(max(1, max_in_flight))
+
+    async def bounded(index, func, args):
+        async with semaphore:
+            result = await func(*args)
+        if on_result is not None:
+            on_result(index, result)
+        return result
+
+    return await asyncio.gather(*(bounded(index, func, args) for index, (func, args) in enumerate(calls)))
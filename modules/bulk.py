@@ -0,0 +1,172 @@
+# modules/bulk.py
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import os
+import queue
+import threading
+import time
+
+from modules.cache import cached_update_task, patch_device_status
+from modules.fetch import is_error_response
+from modules.utils import update_task
+
+# Default number of update_task calls in flight for one bulk command
+BULK_MAX_PARALLEL = int(os.environ.get('MANAGERR_BULK_PARALLEL', 8))
+
+# Default client-side cap on update_task calls per second (0 disables the limit)
+BULK_RATE_LIMIT = float(os.environ.get('MANAGERR_BULK_RATE_LIMIT', 10))
+
+# How bulk commands are sent: 'threads' (requests) or 'async' (aiohttp on the shared loop)
+BULK_BACKEND = os.environ.get('MANAGERR_BULK_BACKEND', 'threads')
+
+
+# Token bucket shared by the worker threads of a bulk command
+class RateLimiter:
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    # Reserve the next call slot; returns how many seconds to wait before using it
+    def reserve(self):
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    # Block until a call may be made
+    def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+
+# Outcome of a bulk command, per device
+class BulkReport:
+    def __init__(self, duration, total):
+        self.duration = duration
+        self.total = total
+        self.succeeded = {}  # device_id -> API response
+        self.failed = {}  # device_id -> error message
+        self.status_codes = {}  # device_id -> HTTP status of a failed call, when there was one
+        self.elapsed = 0.0
+
+    @property
+    def action(self):
+        return 'start' if self.duration > 0 else 'stop'
+
+    @property
+    def ok(self):
+        return not self.failed
+
+    def to_dict(self):
+        return {
+            'action': self.action,
+            'duration': self.duration,
+            'total': self.total,
+            'succeeded': sorted(self.succeeded),
+            'failed': dict(self.failed),
+            'elapsed': round(self.elapsed, 3),
+        }
+
+
+# Function to record one device's outcome in the report
+def _record(report, device_id, response):
+    if is_error_response(response):
+        report.failed[device_id] = response.get('message', 'Failed to execute device command')
+        if response.get('status_code') is not None:
+            report.status_codes[device_id] = response['status_code']
+    else:
+        report.succeeded[device_id] = response
+
+# Function to send a bulk command through the asyncio client: every call is a
+# coroutine on the shared loop, so hundreds can be in flight without threads.
+def _bulk_update_async(device_ids, jwt_token, mobile, duration, max_parallel, rate_limit, on_progress, report, update_func, token_manager):
+    from modules import async_client
+
+    limiter = RateLimiter(rate_limit)
+    results = queue.Queue()
+    update = async_client.update_task if token_manager is None else token_manager.wrap_async(async_client.update_task)
+
+    async def send(device_id):
+        wait = limiter.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return await update(device_id, jwt_token, mobile, duration)
+
+    calls = [(send, (device_id,)) for device_id in device_ids]
+    future = asyncio.run_coroutine_threadsafe(
+        async_client.gather_bounded(calls, max_parallel, on_result=lambda index, result: results.put((index, result))),
+        async_client.get_event_loop(),
+    )
+
+    # Progress is reported here, on the calling thread
+    for done in range(1, len(device_ids) + 1):
+        while True:
+            try:
+                index, response = results.get(timeout=0.5)
+                break
+            except queue.Empty:
+                if future.done():
+                    future.result()  # Re-raise whatever stopped the fan-out
+                    raise RuntimeError("Bulk command ended before reporting every device")
+        device_id = device_ids[index]
+        if not is_error_response(response) and update_func is cached_update_task:
+            patch_device_status(mobile, jwt_token, device_id, 'STARTED' if duration > 0 else 'STOPPED')
+        _record(report, device_id, response)
+        if on_progress is not None:
+            on_progress(done, report.total, device_id, response)
+    future.result()
+
+# Function to start (duration > 0) or stop (duration = 0) many devices at once.
+# Calls are spread over at most `max_parallel` threads and throttled to
+# `rate_limit` calls per second. `on_progress(done, total, device_id, response)`
+# runs on the calling thread as each device completes, so it may update the UI.
+# With a `token_manager` every call sends its current token and is retried once
+# after a 401, on either backend. The async backend has a coroutine for
+# update_task and cached_update_task only; other update functions use threads.
+def bulk_update(device_ids, jwt_token, mobile, duration, max_parallel=BULK_MAX_PARALLEL, rate_limit=BULK_RATE_LIMIT,
+                on_progress=None, update_func=cached_update_task, backend=BULK_BACKEND, token_manager=None):
+    device_ids = list(dict.fromkeys(device_ids))  # Drop duplicates, keep order
+    report = BulkReport(duration, len(device_ids))
+    if not device_ids:
+        return report
+
+    started_at = time.monotonic()
+    if backend == 'async' and update_func in (cached_update_task, update_task):
+        _bulk_update_async(device_ids, jwt_token, mobile, duration, max_parallel, rate_limit, on_progress, report,
+                           update_func, token_manager)
+        report.elapsed = time.monotonic() - started_at
+        return report
+
+    limiter = RateLimiter(rate_limit)
+    if token_manager is not None:
+        update_func = token_manager.wrap(update_func)
+
+    def send(device_id):
+        limiter.acquire()
+        return update_func(device_id, jwt_token, mobile, duration)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_parallel, len(device_ids))),
+                            thread_name_prefix='managerr-bulk') as executor:
+        futures = {executor.submit(send, device_id): device_id for device_id in device_ids}
+        for done, future in enumerate(as_completed(futures), start=1):
+            device_id = futures[future]
+            try:
+                response = future.result()
+            except Exception as e:
+                response = {"success": False, "message": f"API request failed: {str(e)}"}
+
+            _record(report, device_id, response)
+            if on_progress is not None:
+                on_progress(done, report.total, device_id, response)
+
+    report.elapsed = time.monotonic() - started_at
+    return report
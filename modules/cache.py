@@ -0,0 +1,176 @@
+# modules/cache.py
+
+from collections import OrderedDict
+import os
+import threading
+import time
+
+from modules import snapshot_store
+from modules.fetch import get_fetch_executor, is_error_response
+from modules.singleflight import SingleFlight
+from modules.utils import get_iot_devices, get_device_status, poll_device_status, update_task
+
+# Time-to-live (seconds) for the fairly static device list and the volatile status list
+DEVICE_CACHE_TTL = float(os.environ.get('MANAGERR_DEVICE_CACHE_TTL', 300))
+STATUS_CACHE_TTL = float(os.environ.get('MANAGERR_STATUS_CACHE_TTL', 10))
+
+# Maximum number of cached responses kept across all sessions of this process
+CACHE_MAX_ENTRIES = int(os.environ.get('MANAGERR_CACHE_MAX_ENTRIES', 512))
+
+# Persist fresh fetches to the on-disk snapshot store for fast startup and offline reads
+SNAPSHOTS_ENABLED = os.environ.get('MANAGERR_SNAPSHOTS', '1').lower() not in ('0', 'false', 'no')
+
+# Share one backend request between identical concurrent reads (off only for benchmarking)
+COALESCE_ENABLED = os.environ.get('MANAGERR_COALESCE', '1').lower() not in ('0', 'false', 'no')
+
+
+# Thread-safe LRU cache whose entries expire after a per-entry TTL
+class TTLCache:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    # Replace a live entry's value without extending its expiry
+    def patch(self, key, update):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            expires_at, value = entry
+            new_value = update(value)
+            if new_value is None:
+                del self._entries[key]
+                return False
+            self._entries[key] = (expires_at, new_value)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Process-wide cache shared by every Streamlit session
+api_cache = TTLCache(CACHE_MAX_ENTRIES)
+
+# Identical reads from concurrent sessions share one backend request
+request_coalescer = SingleFlight()
+
+# Last live poll per user: (etag, fetched_at, statuses)
+status_polls = TTLCache(CACHE_MAX_ENTRIES)
+STATUS_POLL_TTL = 3600
+
+# Function to run a read through the request coalescer (when enabled)
+def _coalesced(key, func, *args):
+    if COALESCE_ENABLED:
+        return request_coalescer.do(key, func, *args)
+    return func(*args)
+
+# Function to write a fresh fetch to the snapshot store off the calling thread
+def _persist(kind, mobile, payload):
+    if SNAPSHOTS_ENABLED and isinstance(payload, list):
+        get_fetch_executor().submit(snapshot_store.save_snapshot, mobile, kind, payload)
+
+# Function to fetch through the cache; error responses are never cached
+def _cached_call(kind, ttl, func, mobile, jwt_token):
+    key = (kind, mobile, jwt_token)
+    cached = api_cache.get(key)
+    if cached is not None:
+        return cached
+
+    response = _coalesced(key, func, mobile, jwt_token)
+    if not is_error_response(response):
+        api_cache.set(key, response, ttl)
+        _persist(kind, mobile, response)
+    return response
+
+# Function to tell whether both lists of a user are currently cached
+def is_cached(mobile, jwt_token):
+    return api_cache.get(('devices', mobile, jwt_token)) is not None and api_cache.get(('statuses', mobile, jwt_token)) is not None
+
+# Function to fetch IoT devices, served from cache while fresh
+def cached_iot_devices(mobile, jwt_token):
+    return _cached_call('devices', DEVICE_CACHE_TTL, get_iot_devices, mobile, jwt_token)
+
+# Function to fetch device statuses, served from cache while fresh
+def cached_device_status(mobile, jwt_token):
+    return _cached_call('statuses', STATUS_CACHE_TTL, get_device_status, mobile, jwt_token)
+
+# Function to fetch device statuses for live refresh. Reuses the last poll
+# while it is younger than `max_age` seconds, otherwise sends a conditional
+# request so an unchanged status list costs no body download.
+def live_device_status(mobile, jwt_token, max_age):
+    key = ('statuses', mobile, jwt_token)
+    poll = status_polls.get(key)
+    if poll is not None and time.monotonic() - poll[1] < max_age:
+        return poll[2]
+
+    etag = poll[0] if poll is not None else None
+    statuses, etag = _coalesced(('poll', mobile, jwt_token, etag), poll_device_status, mobile, jwt_token, etag)
+    if statuses is None:  # 304 Not Modified
+        statuses = poll[2]
+    elif not is_error_response(statuses):
+        _persist('statuses', mobile, statuses)
+    if not is_error_response(statuses):
+        api_cache.set(key, statuses, STATUS_CACHE_TTL)
+        status_polls.set(key, (etag, time.monotonic(), statuses), STATUS_POLL_TTL)
+    return statuses
+
+# Function to replace the cached status list with a freshly fetched one
+def store_device_status(mobile, jwt_token, statuses):
+    key = ('statuses', mobile, jwt_token)
+    api_cache.set(key, statuses, STATUS_CACHE_TTL)
+    status_polls.delete(key)
+    request_coalescer.forget(key)
+    _persist('statuses', mobile, statuses)
+
+# Function to patch the cached status of a single device after a command.
+# Falls back to dropping the status entry if the device is not in it.
+def patch_device_status(mobile, jwt_token, device_id, action):
+    key = ('statuses', mobile, jwt_token)
+
+    def update(statuses):
+        if not isinstance(statuses, list) or not any(status.get('id') == device_id for status in statuses):
+            return None
+        return [dict(status, action=action) if status.get('id') == device_id else status for status in statuses]
+
+    if not api_cache.patch(key, update):
+        api_cache.delete(key)
+    status_polls.delete(key)  # Force the next live poll to fetch the new state
+    request_coalescer.forget(key)
+
+# Function to drop every cached response belonging to a user
+def invalidate_user(mobile, jwt_token):
+    api_cache.delete(('devices', mobile, jwt_token))
+    api_cache.delete(('statuses', mobile, jwt_token))
+    status_polls.delete(('statuses', mobile, jwt_token))
+
+# Function to update the task and write the new status through to the cache
+def cached_update_task(device_id, jwt_token, mobile, duration):
+    response = update_task(device_id, jwt_token, mobile, duration)
+    if not is_error_response(response):
+        patch_device_status(mobile, jwt_token, device_id, 'STARTED' if duration > 0 else 'STOPPED')
+    return response
@@ -0,0 +1,201 @@
+# modules/cli.py
+#
+# Command-line entry point for scripted fleet operations. It uses the same API
+# layer as the app but never imports Streamlit, so it starts fast under cron.
+#
+#   python cli.py login --mobile 98xxxxxxxx            # prints a token
+#   python cli.py devices --format csv
+#   python cli.py statuses --format json > statuses.json
+#   python cli.py stop --file ids.txt --parallel 16
+#   python cli.py statuses --format csv | grep STOPPED | python cli.py start --duration 30
+#
+# Credentials come from --mobile/--token (or MANAGERR_MOBILE/MANAGERR_TOKEN);
+# with MANAGERR_PASSWORD (or a prompt) the CLI logs in by itself.
+
+import argparse
+import csv
+import getpass
+import json
+import os
+import sys
+
+from modules.bulk import BULK_MAX_PARALLEL, BULK_RATE_LIMIT, bulk_update
+from modules.fetch import fetch_concurrently, is_error_response
+from modules.fleet import Fleet
+from modules.tokens import TokenManager
+from modules.utils import login_api_call, stream_iot_devices, stream_device_status, update_task
+
+# Exit codes: everything succeeded, nothing (or a prerequisite) succeeded, some devices failed
+EXIT_OK, EXIT_FAILED, EXIT_PARTIAL = 0, 1, 2
+
+
+# Raised for errors that end the command with a message on stderr
+class CliError(Exception):
+    pass
+
+
+# Function to get a password from MANAGERR_PASSWORD or an interactive prompt
+def read_password():
+    password = os.environ.get('MANAGERR_PASSWORD')
+    if password is None:
+        if not sys.stdin.isatty():
+            raise CliError("No password: set MANAGERR_PASSWORD or run interactively")
+        password = getpass.getpass("Password: ")
+    return password
+
+# Function to log in and return the JWT token
+def login(mobile, password):
+    auth_response = login_api_call(mobile, password)
+    if 'jwt_token' not in auth_response:
+        raise CliError(auth_response.get('message', 'Login failed'))
+    return auth_response['jwt_token']
+
+# Function to build the account's token manager from the arguments, logging in
+# if no token is given. With MANAGERR_PASSWORD set the token is also renewed
+# when it nears expiry or gets rejected mid-run.
+def credentials(args):
+    if not args.mobile:
+        raise CliError("No account: pass --mobile or set MANAGERR_MOBILE")
+    password = os.environ.get('MANAGERR_PASSWORD')
+    if args.token:
+        return TokenManager(args.mobile, args.token, password)
+    password = read_password()
+    return TokenManager(args.mobile, login(args.mobile, password), password)
+
+# Function to fetch an account's devices and statuses concurrently as a Fleet.
+# Both lists are streamed straight into Device/Status objects.
+def load_fleet(token_manager, with_statuses=True):
+    mobile, jwt_token = token_manager.mobile, token_manager.get()
+    calls = {'devices': (token_manager.wrap(stream_iot_devices), (mobile, jwt_token))}
+    if with_statuses:
+        calls['statuses'] = (token_manager.wrap(stream_device_status), (mobile, jwt_token))
+    page_data = fetch_concurrently(calls)
+    if page_data['errors']:
+        raise CliError('; '.join(page_data['errors'].values()))
+    return Fleet(page_data['devices'], page_data.get('statuses', []))
+
+# Function to write rows (a list of dicts) as JSON, CSV or an aligned table
+def write_rows(rows, columns, fmt, out):
+    if fmt == 'json':
+        json.dump(rows, out, indent=2)
+        out.write('\n')
+    elif fmt == 'csv':
+        writer = csv.DictWriter(out, fieldnames=columns, lineterminator='\n')
+        writer.writeheader()
+        writer.writerows(rows)
+    else:
+        widths = {column: max([len(column)] + [len(str(row[column])) for row in rows]) for column in columns}
+        out.write('  '.join(column.upper().ljust(widths[column]) for column in columns).rstrip() + '\n')
+        for row in rows:
+            out.write('  '.join(str(row[column]).ljust(widths[column]) for column in columns).rstrip() + '\n')
+
+# Function to read device ids, one per line, from a file or stdin. Only the
+# first CSV field is used, so `statuses --format csv` output can be piped in;
+# blank lines, '#' comments and an 'id' header are skipped.
+def read_device_ids(lines):
+    device_ids = []
+    for line in lines:
+        device_id = line.split(',', 1)[0].strip()
+        if device_id and not device_id.startswith('#') and device_id != 'id':
+            device_ids.append(device_id)
+    return device_ids
+
+# Subcommand: log in and print the token
+def cmd_login(args):
+    if not args.mobile:
+        raise CliError("No account: pass --mobile or set MANAGERR_MOBILE")
+    print(login(args.mobile, read_password()))
+    return EXIT_OK
+
+# Subcommand: list the account's devices
+def cmd_devices(args):
+    fleet = load_fleet(credentials(args), with_statuses=False)
+    rows = [{'id': device.id, 'label': device.label or ''} for device in fleet]
+    write_rows(rows, ['id', 'label'], args.format, sys.stdout)
+    return EXIT_OK
+
+# Subcommand: dump device statuses, optionally only one status
+def cmd_statuses(args):
+    fleet = load_fleet(credentials(args))
+    rows = [{'id': device.id, 'label': device.label or '', 'status': fleet.status_of(device.id)}
+            for device in fleet.filter(status=args.status)]
+    write_rows(rows, ['id', 'label', 'status'], args.format, sys.stdout)
+    return EXIT_OK
+
+# Subcommand: start or stop the given devices; exit code 2 if only some succeeded
+def cmd_bulk(args):
+    if args.device_ids:
+        device_ids = args.device_ids
+    elif args.file and args.file != '-':
+        with open(args.file, encoding='utf-8') as f:
+            device_ids = read_device_ids(f)
+    else:
+        device_ids = read_device_ids(sys.stdin)
+    if not device_ids:
+        raise CliError("No device ids given")
+
+    token_manager = credentials(args)
+    duration = args.duration if args.command == 'start' else 0
+
+    def on_progress(done, total, device_id, response):
+        if not args.quiet:
+            outcome = response.get('message', 'failed') if is_error_response(response) else 'ok'
+            print(f"[{done}/{total}] {device_id}: {outcome}", file=sys.stderr)
+
+    report = bulk_update(device_ids, token_manager.get(), token_manager.mobile, duration, max_parallel=args.parallel,
+                         rate_limit=args.rate_limit, on_progress=on_progress, update_func=update_task,
+                         token_manager=token_manager)
+    json.dump(report.to_dict(), sys.stdout, indent=2)
+    sys.stdout.write('\n')
+    if report.ok:
+        return EXIT_OK
+    return EXIT_PARTIAL if report.succeeded else EXIT_FAILED
+
+
+# Function to build the argument parser
+def build_parser():
+    parser = argparse.ArgumentParser(prog='managerr', description="Manage Robo Rakhwala devices from the command line.")
+    account = argparse.ArgumentParser(add_help=False)
+    account.add_argument('--mobile', default=os.environ.get('MANAGERR_MOBILE'), help="account mobile number (MANAGERR_MOBILE)")
+    account.add_argument('--token', default=os.environ.get('MANAGERR_TOKEN'),
+                         help="JWT token from `login` (MANAGERR_TOKEN); without it the CLI logs in using MANAGERR_PASSWORD,"
+                              " which also lets it renew an expiring token")
+    formats = argparse.ArgumentParser(add_help=False)
+    formats.add_argument('--format', choices=('table', 'json', 'csv'), default='table')
+
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('login', parents=[account], help="log in and print the JWT token").set_defaults(func=cmd_login)
+    commands.add_parser('devices', parents=[account, formats], help="list devices").set_defaults(func=cmd_devices)
+    statuses = commands.add_parser('statuses', parents=[account, formats], help="dump device statuses")
+    statuses.add_argument('--status', help="only devices with this status, e.g. STARTED")
+    statuses.set_defaults(func=cmd_statuses)
+
+    for name, help_text in (('start', "start devices"), ('stop', "stop devices")):
+        bulk = commands.add_parser(name, parents=[account], help=help_text)
+        bulk.add_argument('device_ids', nargs='*', help="device ids (default: read from --file or stdin)")
+        bulk.add_argument('--file', help="file with one device id per line ('-' for stdin)")
+        if name == 'start':
+            bulk.add_argument('--duration', type=int, required=True, help="minutes to run")
+        bulk.add_argument('--parallel', type=int, default=BULK_MAX_PARALLEL, help="calls in flight at once")
+        bulk.add_argument('--rate-limit', type=float, default=BULK_RATE_LIMIT, help="calls per second, 0 for no limit")
+        bulk.add_argument('--quiet', action='store_true', help="no per-device progress on stderr")
+        bulk.set_defaults(func=cmd_bulk)
+    return parser
+
+# Function to run the CLI; returns the exit code
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if getattr(args, 'duration', 1) <= 0:
+        print("error: --duration must be positive (use `stop` to stop devices)", file=sys.stderr)
+        return EXIT_FAILED
+    try:
+        return args.func(args)
+    except (CliError, OSError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return EXIT_FAILED
+    except KeyboardInterrupt:
+        return 130
+
+
+if __name__ == '__main__':
+    sys.exit(main())
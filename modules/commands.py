@@ -0,0 +1,86 @@
+# modules/commands.py
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import os
+import time
+
+from modules.cache import cached_update_task, store_device_status
+from modules.fetch import is_error_response
+from modules.utils import get_device_status
+
+# Number of background threads sending optimistic start/stop commands
+COMMAND_WORKERS = int(os.environ.get('MANAGERR_COMMAND_WORKERS', 8))
+
+# Statuses shown while a command is in flight
+PENDING_ACTIONS = {'STARTED': 'STARTING', 'STOPPED': 'STOPPING'}
+
+
+# A start/stop command sent off the script thread, awaiting reconciliation
+class PendingCommand:
+    __slots__ = ('device_id', 'duration', 'previous_action', 'future', 'submitted_at')
+
+    def __init__(self, device_id, duration, previous_action, future):
+        self.device_id = device_id
+        self.duration = duration
+        self.previous_action = previous_action
+        self.future = future
+        self.submitted_at = time.monotonic()
+
+    @property
+    def target_action(self):
+        return 'STARTED' if self.duration > 0 else 'STOPPED'
+
+    @property
+    def pending_action(self):
+        return PENDING_ACTIONS[self.target_action]
+
+
+# Function to get the process-wide pool that sends optimistic commands
+@lru_cache(maxsize=None)
+def get_command_executor():
+    return ThreadPoolExecutor(max_workers=COMMAND_WORKERS, thread_name_prefix='managerr-command')
+
+# Function to send update_task in the background and record it as pending.
+# `pending` is the session's {device_id: PendingCommand} dict.
+def submit_command(pending, device_id, jwt_token, mobile, duration, previous_action):
+    future = get_command_executor().submit(cached_update_task, device_id, jwt_token, mobile, duration)
+    pending[device_id] = PendingCommand(device_id, duration, previous_action, future)
+
+# Function to show pending commands as STARTING/STOPPING on top of the fetched statuses
+def pending_overrides(pending):
+    return {device_id: command.pending_action for device_id, command in pending.items()}
+
+# Function to settle finished commands against a single status poll.
+# Returns a list of error messages for commands that were rolled back.
+def reconcile_commands(pending, mobile, jwt_token, display_name=str):
+    finished = [command for command in pending.values() if command.future.done()]
+    if not finished:
+        return []
+
+    errors = []
+    accepted = []
+    for command in finished:
+        try:
+            response = command.future.result()
+        except Exception as e:
+            response = {"success": False, "message": f"API request failed: {str(e)}"}
+        if is_error_response(response):
+            del pending[command.device_id]
+            errors.append(f"{display_name(command.device_id)}: {response.get('message', 'Failed to execute device command')}")
+        else:
+            accepted.append(command)
+
+    if accepted:
+        statuses = get_device_status(mobile, jwt_token)
+        if isinstance(statuses, list):
+            store_device_status(mobile, jwt_token, statuses)
+            actions = {status.get('id'): status.get('action') for status in statuses}
+            for command in accepted:
+                del pending[command.device_id]
+                if actions.get(command.device_id) != command.target_action:
+                    errors.append(f"{display_name(command.device_id)}: backend reports "
+                                  f"{actions.get(command.device_id, 'UNKNOWN')}, expected {command.target_action}")
+        # If the poll itself failed, keep the commands pending and try again next run
+
+    return errors
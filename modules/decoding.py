@@ -0,0 +1,97 @@
+# modules/decoding.py
+
+import codecs
+import json
+import os
+import re
+
+# orjson is optional: it decodes several times faster than the standard library
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Bytes read per chunk when streaming a response body
+STREAM_CHUNK_SIZE = int(os.environ.get('MANAGERR_STREAM_CHUNK_SIZE', 64 * 1024))
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_decoder = json.JSONDecoder()
+
+
+# Function to decode a JSON document from bytes or str with the fastest decoder available
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+# Function to decode the JSON body of a requests response
+def decode_response(response):
+    return loads(response.content)
+
+# Function to yield the elements of a top-level JSON array from an iterable of
+# byte chunks, one element at a time, without holding the whole document or
+# the full list. Raises ValueError for anything but a well-formed array,
+# including missing or extra commas and data after the closing bracket.
+def iter_json_array(chunks):
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    position = 0
+    expect = '['  # '[', then 'value or ]', 'value' (after a comma) or ', or ]'; None once closed
+    chunks = iter(chunks)
+    final = False
+
+    while not final:
+        chunk = next(chunks, None)
+        final = chunk is None
+        buffer = buffer[position:] + text_decoder.decode(chunk or b'', final=final)
+        position = 0
+
+        while True:
+            position = _WHITESPACE.match(buffer, position).end()
+            if position == len(buffer):
+                break
+            char = buffer[position]
+            if expect is None:
+                raise ValueError("Unexpected data after the JSON array")
+            if expect == '[':
+                if char != '[':
+                    raise ValueError("Expected a JSON array")
+                expect = 'value or ]'
+                position += 1
+                continue
+            if expect == ', or ]':
+                if char not in ',]':
+                    raise ValueError("Expected ',' or ']'")
+                expect = 'value' if char == ',' else None
+                position += 1
+                continue
+            if char == ']' and expect == 'value or ]':
+                expect = None
+                position += 1
+                continue
+            if char in ',]':
+                raise ValueError("Expected a value")
+            try:
+                value, end = _decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if final:
+                    raise
+                break  # The element continues in the next chunk
+            # Only trust the element once its delimiter has arrived: a number
+            # such as "12" or "2." may still be cut short at the chunk boundary
+            following = _WHITESPACE.match(buffer, end).end()
+            if following == len(buffer) or buffer[following] not in ',]':
+                if final:
+                    raise ValueError("Truncated JSON array" if following == len(buffer) else "Expected ',' or ']'")
+                break
+            yield value
+            expect = ', or ]'
+            position = end
+
+    if expect is not None:
+        raise ValueError("Truncated JSON array")
+
+# Function to stream the records of a JSON array response, building each one
+# with `factory` as it arrives (the response must be sent with stream=True)
+def stream_records(response, factory):
+    return [factory(record) for record in iter_json_array(response.iter_content(STREAM_CHUNK_SIZE))]
@@ -0,0 +1,50 @@
+# modules/diagnostics.py
+
+import streamlit as st
+
+from modules import metrics, resilience
+
+# Function to apply the toggle to the process-wide flag; only runs when this session flips it
+def toggle_diagnostics():
+    metrics.set_enabled(st.session_state['diagnostics_enabled'])
+
+# Function to render the opt-in diagnostics panel in the sidebar
+def diagnostics_sidebar():
+    with st.sidebar.expander("Diagnostics"):
+        # The flag is shared by every session, so the toggle shows its current value
+        st.session_state['diagnostics_enabled'] = metrics.enabled
+        st.toggle("Record timings", key='diagnostics_enabled', on_change=toggle_diagnostics,
+                  help="Applies to the whole server process")
+        if not metrics.enabled:
+            return
+
+        open_circuits = [endpoint for endpoint, state in resilience.breaker_states().items() if state != 'closed']
+        if open_circuits:
+            st.warning(f"Circuit open: {', '.join(open_circuits)}")
+
+        data = metrics.snapshot()
+        if data['requests']:
+            st.caption("API latency (bucket upper bounds, seconds)")
+            st.dataframe({
+                'Endpoint': list(data['requests']),
+                'Calls': [histogram['count'] for histogram in data['requests'].values()],
+                'p50': [histogram['p50'] for histogram in data['requests'].values()],
+                'p95': [histogram['p95'] for histogram in data['requests'].values()],
+                'Retries': [data['retries'].get(endpoint, 0) for endpoint in data['requests']],
+            }, hide_index=True)
+            st.caption("Status codes")
+            st.dataframe(data['status_codes'], hide_index=True)
+        if data['renders']:
+            st.caption("Page render time (seconds)")
+            st.dataframe({
+                'Page': list(data['renders']),
+                'Renders': [histogram['count'] for histogram in data['renders'].values()],
+                'p50': [histogram['p50'] for histogram in data['renders'].values()],
+                'p95': [histogram['p95'] for histogram in data['renders'].values()],
+            }, hide_index=True)
+
+        col1, col2 = st.columns(2)
+        col1.download_button("Prometheus", metrics.export_prometheus(), file_name='managerr_metrics.prom', mime='text/plain')
+        col2.download_button("JSON", metrics.export_json(), file_name='managerr_metrics.json', mime='application/json')
+        if st.button("Reset", key='diagnostics_reset'):
+            metrics.reset()
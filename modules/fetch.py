@@ -0,0 +1,36 @@
+# modules/fetch.py
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import os
+
+# Maximum number of API calls a single page may have in flight at once
+FETCH_MAX_WORKERS = int(os.environ.get('MANAGERR_FETCH_WORKERS', 16))
+
+# Function to get the process-wide thread pool used for page fetches
+@lru_cache(maxsize=None)
+def get_fetch_executor():
+    return ThreadPoolExecutor(max_workers=FETCH_MAX_WORKERS, thread_name_prefix='managerr-fetch')
+
+# Function to tell whether an API helper returned one of its error dicts
+def is_error_response(response):
+    return isinstance(response, dict) and response.get('success') is False
+
+# Function to run several independent API calls at once.
+# `calls` maps a name to (function, args); the result maps every name to its
+# response, plus an 'errors' dict holding the message of each failed call.
+def fetch_concurrently(calls):
+    executor = get_fetch_executor()
+    futures = {name: executor.submit(func, *args) for name, (func, args) in calls.items()}
+
+    results = {'errors': {}}
+    for name, future in futures.items():
+        try:
+            response = future.result()
+        except Exception as e:
+            response = {"success": False, "message": f"API request failed: {str(e)}"}
+
+        results[name] = response
+        if is_error_response(response):
+            results['errors'][name] = response.get('message', 'Request failed')
+    return results
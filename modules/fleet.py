@@ -0,0 +1,158 @@
+# modules/fleet.py
+
+# Status shown for devices that are missing from the get_task response
+UNKNOWN_STATUS = 'UNKNOWN'
+
+
+# A registered device as returned by get_user_profile_details
+class Device:
+    __slots__ = ('id', 'label', 'account')
+
+    def __init__(self, id, label=None, account=None):
+        self.id = id
+        self.label = label
+        self.account = account
+
+    @classmethod
+    def from_dict(cls, data, account=None):
+        return cls(data['id'], data.get('device_label'), account)
+
+    # Index key: the device id, or (account, device id) in a multi-account fleet
+    @property
+    def key(self):
+        return self.id if self.account is None else (self.account, self.id)
+
+    # Show device_label or fall back to the device id
+    @property
+    def display_name(self):
+        return self.label if self.label else self.id
+
+    def __repr__(self):
+        return f'Device({self.id!r}, {self.label!r}, {self.account!r})'
+
+
+# A device's task state as returned by get_task
+class Status:
+    __slots__ = ('device_id', 'action', 'account')
+
+    def __init__(self, device_id, action, account=None):
+        self.device_id = device_id
+        self.action = action
+        self.account = account
+
+    @classmethod
+    def from_dict(cls, data, account=None):
+        return cls(data['id'], data.get('action', UNKNOWN_STATUS), account)
+
+    @property
+    def key(self):
+        return self.device_id if self.account is None else (self.account, self.device_id)
+
+    def __repr__(self):
+        return f'Status({self.device_id!r}, {self.action!r}, {self.account!r})'
+
+
+# Devices and statuses of one fetch, indexed by device key (the device id,
+# or (account, device id) when several accounts are merged)
+class Fleet:
+    __slots__ = ('devices', 'statuses')
+
+    def __init__(self, devices=(), statuses=()):
+        self.devices = {device.key: device for device in devices}
+        self.statuses = {status.key: status for status in statuses}
+
+    # Build the fleet once per fetch from the raw API lists
+    @classmethod
+    def from_responses(cls, devices_response, status_response, account=None):
+        return cls(
+            (Device.from_dict(device, account) for device in devices_response),
+            (Status.from_dict(status, account) for status in status_response),
+        )
+
+    # One fleet over several accounts, from {account: (devices_response, status_response)}
+    @classmethod
+    def merge(cls, responses):
+        fleet = cls()
+        for account, (devices_response, status_response) in responses.items():
+            part = cls.from_responses(devices_response, status_response, account)
+            fleet.devices.update(part.devices)
+            fleet.statuses.update(part.statuses)
+        return fleet
+
+    # New snapshot with fresh statuses that shares this fleet's device index
+    def with_statuses(self, status_response):
+        fleet = Fleet()
+        fleet.devices = self.devices
+        fleet.statuses = {status.key: status for status in map(Status.from_dict, status_response)}
+        return fleet
+
+    # New snapshot with some statuses replaced, e.g. {'dev-1': 'STARTING'}
+    def with_overrides(self, overrides):
+        if not overrides:
+            return self
+        fleet = Fleet()
+        fleet.devices = self.devices
+        fleet.statuses = dict(self.statuses)
+        for key, action in overrides.items():
+            fleet.statuses[key] = Status(key, action)
+        return fleet
+
+    def __len__(self):
+        return len(self.devices)
+
+    def __iter__(self):
+        return iter(self.devices.values())
+
+    def __contains__(self, device_id):
+        return device_id in self.devices
+
+    def get(self, device_id):
+        return self.devices.get(device_id)
+
+    # O(1) status lookup for a device
+    def status_of(self, device_id):
+        status = self.statuses.get(device_id)
+        return status.action if status is not None else UNKNOWN_STATUS
+
+    # Devices grouped by their current status, e.g. {'STARTED': [...], 'STOPPED': [...]}
+    def group_by_status(self):
+        groups = {}
+        for key, device in self.devices.items():
+            groups.setdefault(self.status_of(key), []).append(device)
+        return groups
+
+    def count_by_status(self):
+        return {action: len(devices) for action, devices in self.group_by_status().items()}
+
+    # Devices whose name, id or account contains `query` (case-insensitive),
+    # optionally limited to one status and/or one account
+    def filter(self, query='', status=None, account=None):
+        query = query.strip().lower()
+        matches = []
+        for device in self.devices.values():
+            if status is not None and self.status_of(device.key) != status:
+                continue
+            if account is not None and device.account != account:
+                continue
+            if query and query not in str(device.id).lower() and query not in str(device.label or '').lower() \
+                    and query not in str(device.account or '').lower():
+                continue
+            matches.append(device)
+        return matches
+
+    # Changes since a previous snapshot: {device_id: (old_status, new_status)}.
+    # Added devices have old_status None, removed devices have new_status None.
+    def diff(self, previous):
+        if previous is None:
+            return {device_id: (None, self.status_of(device_id)) for device_id in self.devices}
+
+        changes = {}
+        for device_id in self.devices:
+            new_status = self.status_of(device_id)
+            old_status = previous.status_of(device_id) if device_id in previous else None
+            if old_status != new_status:
+                changes[device_id] = (old_status, new_status)
+        for device_id in previous.devices:
+            if device_id not in self.devices:
+                changes[device_id] = (previous.status_of(device_id), None)
+        return changes
@@ -0,0 +1,128 @@
+# modules/fleet_dashboard.py
+
+from concurrent.futures import wait
+
+import streamlit as st
+
+from modules.accounts import collect_accounts, submit_account_fetches
+from modules.cache import invalidate_user
+from modules.iot_device import paginate
+from modules.metrics import timed_page
+from modules.utils import login_api_call
+
+# How long the page waits for every account before rendering the ones that answered
+FLEET_FIRST_RENDER_WAIT = 0.5
+
+# How often (seconds) the fleet view refreshes while accounts are still loading
+FLEET_POLL_INTERVAL = 0.5
+
+# Function to mask a mobile number for display
+def mask_mobile(mobile):
+    return f"{'•' * max(0, len(mobile) - 4)}{mobile[-4:]}"
+
+# Function to get every account of the session: the logged-in one plus the added ones (mobile -> jwt_token)
+def session_accounts():
+    accounts = {st.session_state['mobile']: st.session_state['jwt_token']}
+    accounts.update(st.session_state.setdefault('accounts', {}))
+    return accounts
+
+# Function to add or remove the extra accounts of the fleet
+def manage_accounts_panel():
+    extra = st.session_state.setdefault('accounts', {})
+    with st.expander(f"Accounts ({len(extra) + 1})"):
+        with st.form("add_account_form", clear_on_submit=True):
+            mobile = st.text_input("Mobile Number", placeholder="Customer mobile number")
+            password = st.text_input("Password", type="password", placeholder="Customer password")
+            add_clicked = st.form_submit_button("Add account")
+
+        if add_clicked:
+            if mobile == st.session_state['mobile'] or mobile in extra:
+                st.info("This account is already in the fleet.")
+            else:
+                auth_response = login_api_call(mobile, password)
+                if 'jwt_token' in auth_response:
+                    extra[mobile] = auth_response['jwt_token']
+                    st.success(f"Added {mask_mobile(mobile)}")
+                else:
+                    st.error(auth_response.get('message', 'Login failed'))
+
+        if extra:
+            remove = st.multiselect("Remove accounts", list(extra), format_func=mask_mobile, key='fleet_remove_accounts')
+            if st.button("Remove", disabled=not remove, key='fleet_remove_button'):
+                for mobile in remove:
+                    invalidate_user(mobile, extra.pop(mobile))
+                st.session_state.pop('fleet_remove_accounts', None)
+                st.rerun()
+
+# Function to render the per-account health table
+def account_health_table(health):
+    st.dataframe({
+        'Account': [mask_mobile(mobile) for mobile in health],
+        'Health': ['OK' if entry['ok'] else 'Loading' if entry['loading'] else 'Error' for entry in health.values()],
+        'Devices': [entry['devices'] for entry in health.values()],
+        'Running': [entry['running'] for entry in health.values()],
+        'Latency (ms)': [round(entry['latency'] * 1000) for entry in health.values()],
+        'Error': [entry['message'] or '' for entry in health.values()],
+    }, hide_index=True)
+
+# Function to render the fleet from the account fetches as they stand now.
+# While some accounts are still loading it runs as a fragment polling every
+# FLEET_POLL_INTERVAL; once every account has answered or timed out it
+# remembers the timed-out ones and reruns the page, which stops the polling.
+def fleet_view(accounts, futures):
+    given_up = st.session_state['fleet_given_up']
+    fleet, health = collect_accounts(accounts, futures, given_up=given_up)
+    loading = [mobile for mobile, entry in health.items() if entry['loading']]
+    if not loading and st.session_state.get('fleet_polling'):
+        given_up.update(mobile for mobile, entry in health.items() if entry['timed_out'])
+        st.session_state['fleet_polling'] = False
+        st.rerun()
+
+    failed = sum(not entry['ok'] and not entry['loading'] for entry in health.values())
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Accounts", len(accounts), f"-{failed} failing" if failed else None)
+    col2.metric("Devices", len(fleet))
+    col3.metric("Running", fleet.count_by_status().get('STARTED', 0))
+    if loading:
+        st.caption(f"Loading {len(loading)} of {len(accounts)} accounts...")
+    account_health_table(health)
+
+    # Search, status and account filters over the merged fleet
+    col1, col2, col3 = st.columns([3, 2, 2])
+    query = col1.text_input("Search", placeholder="Device name, id or account", key='fleet_search')
+    status_filter = col2.selectbox("Status", ['All'] + sorted(fleet.count_by_status()), key='fleet_status_filter')
+    account_filter = col3.selectbox("Account", ['All'] + [mobile for mobile in accounts if health[mobile]['ok']],
+                                    format_func=lambda mobile: mobile if mobile == 'All' else mask_mobile(mobile),
+                                    key='fleet_account_filter')
+    filtered = fleet.filter(query, None if status_filter == 'All' else status_filter,
+                            None if account_filter == 'All' else account_filter)
+
+    visible = paginate(filtered, key='fleet')
+    st.dataframe({
+        'Account': [mask_mobile(device.account) for device in visible],
+        'Device': [device.display_name for device in visible],
+        'ID': [device.id for device in visible],
+        'Status': [fleet.status_of(device.key) for device in visible],
+    }, hide_index=True)
+
+# Function to display the devices of every session account in one view.
+# Fast accounts are shown at once; slow ones fill in as they answer.
+@timed_page
+def fleet_dashboard_page():
+    st.title("Fleet")
+    manage_accounts_panel()
+
+    accounts = session_accounts()
+    futures = submit_account_fetches(accounts)
+
+    # Accounts given up on are not waited for (so the page stays still) until their calls return
+    given_up = st.session_state.setdefault('fleet_given_up', set())
+    given_up.intersection_update(mobile for (mobile, _), future in futures.items() if not future.done())
+    wait([future for (mobile, _), future in futures.items() if mobile not in given_up], timeout=FLEET_FIRST_RENDER_WAIT)
+
+    pending = {mobile for (mobile, _), future in futures.items() if not future.done()} - given_up
+    st.session_state['fleet_polling'] = bool(pending)
+    if pending:
+        st.fragment(fleet_view, run_every=FLEET_POLL_INTERVAL)(accounts, futures)
+    else:
+        fleet_view(accounts, futures)
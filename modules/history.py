@@ -0,0 +1,193 @@
+# modules/history.py
+
+import os
+import threading
+import time
+
+import numpy as np
+
+# How long status transitions are kept, and the hard cap on stored events
+HISTORY_RETENTION = float(os.environ.get('MANAGERR_HISTORY_RETENTION', 7 * 24 * 3600))
+HISTORY_MAX_EVENTS = int(os.environ.get('MANAGERR_HISTORY_MAX_EVENTS', 2_000_000))
+
+# How often record() drops events past the retention window
+HISTORY_COMPACT_INTERVAL = float(os.environ.get('MANAGERR_HISTORY_COMPACT_INTERVAL', 600))
+
+# Status values that count as running
+RUNNING_ACTIONS = frozenset({'STARTED'})
+
+_INITIAL_CAPACITY = 4096
+
+
+# Append-only columnar store of device status transitions.
+# Only changes are stored: one row per (time, device, running?) transition,
+# kept in NumPy arrays that grow by doubling and are compacted in place.
+class StatusHistory:
+    def __init__(self, retention=HISTORY_RETENTION, max_events=HISTORY_MAX_EVENTS, compact_interval=HISTORY_COMPACT_INTERVAL):
+        self.retention = retention
+        self.max_events = max_events
+        self.compact_interval = compact_interval
+        self._next_compaction = 0.0
+        self.size = 0
+        self.times = np.empty(_INITIAL_CAPACITY, dtype=np.float64)
+        self.devices = np.empty(_INITIAL_CAPACITY, dtype=np.int32)
+        self.running = np.empty(_INITIAL_CAPACITY, dtype=np.int8)
+        self.first = np.empty(_INITIAL_CAPACITY, dtype=np.bool_)  # First observation, not a transition
+        self.device_index = {}  # (account, device_id) -> device number
+        self.device_ids = []  # device number -> device_id
+        self.device_accounts = np.empty(0, dtype=np.int32)  # device number -> account number
+        self.account_index = {}  # account -> account number
+        self.last_running = np.empty(0, dtype=np.int8)  # device number -> last state, -1 unseen
+        self._last_seen = {}  # account -> last status list recorded
+        self._lock = threading.Lock()
+
+    def _device_number(self, account_number, account, device_id):
+        key = (account, device_id)
+        number = self.device_index.get(key)
+        if number is None:
+            number = self.device_index[key] = len(self.device_ids)
+            self.device_ids.append(device_id)
+            if number >= len(self.last_running):
+                grow = max(1024, len(self.last_running))
+                self.last_running = np.concatenate([self.last_running, np.full(grow, -1, dtype=np.int8)])
+                self.device_accounts = np.concatenate([self.device_accounts, np.full(grow, -1, dtype=np.int32)])
+            self.device_accounts[number] = account_number
+        return number
+
+    def _reserve(self, extra):
+        needed = self.size + extra
+        if needed <= len(self.times):
+            return
+        capacity = max(needed, 2 * len(self.times))
+        for name in ('times', 'devices', 'running', 'first'):
+            column = getattr(self, name)
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            setattr(self, name, grown)
+
+    # Record one get_task response; only devices whose state changed are stored.
+    # Every compact_interval seconds old events are also dropped, even when
+    # nothing changed, so retention holds without reaching the size cap.
+    def record(self, account, statuses, timestamp=None):
+        if not isinstance(statuses, list):
+            return 0
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            if timestamp >= self._next_compaction:
+                self._compact(timestamp)
+                self._next_compaction = timestamp + self.compact_interval
+
+            # The cache hands back the same list object until it refetches
+            if self._last_seen.get(account) is statuses:
+                return 0
+            self._last_seen[account] = statuses
+
+            account_number = self.account_index.setdefault(account, len(self.account_index))
+            numbers = np.fromiter(
+                (self._device_number(account_number, account, status.get('id')) for status in statuses),
+                dtype=np.int32, count=len(statuses),
+            )
+            running = np.fromiter((status.get('action') in RUNNING_ACTIONS for status in statuses),
+                                  dtype=np.int8, count=len(statuses))
+
+            previous = self.last_running[numbers]
+            changed = previous != running
+            count = int(changed.sum())
+            if not count:
+                return 0
+
+            self._reserve(count)
+            end = self.size + count
+            self.times[self.size:end] = timestamp
+            self.devices[self.size:end] = numbers[changed]
+            self.running[self.size:end] = running[changed]
+            self.first[self.size:end] = previous[changed] < 0
+            self.size = end
+            self.last_running[numbers] = running
+
+            if self.size > self.max_events:
+                self._compact(timestamp)
+            return count
+
+    # Drop events older than the retention window (or the oldest half when over
+    # the cap), keeping each device's last dropped event as its state at the cutoff
+    def _compact(self, now):
+        times = self.times[:self.size]
+        cutoff = now - self.retention
+        if self.size - np.searchsorted(times, cutoff) > self.max_events // 2:
+            cutoff = times[self.size - self.max_events // 2]
+
+        old = times < cutoff
+        if not old.any():
+            return
+        old_devices = self.devices[:self.size][old]
+        # Index of each device's last old event
+        _, last_from_end = np.unique(old_devices[::-1], return_index=True)
+        baseline = np.flatnonzero(old)[len(old_devices) - 1 - last_from_end]
+
+        keep = np.sort(np.concatenate([baseline, np.flatnonzero(~old)]))
+        count = len(keep)
+        self.times[:count] = np.maximum(self.times[keep], np.where(old[keep], cutoff, -np.inf))
+        self.devices[:count] = self.devices[keep]
+        self.running[:count] = self.running[keep]
+        self.first[:count] = self.first[keep] | old[keep]
+        self.size = count
+
+    def compact(self, now=None):
+        with self._lock:
+            self._compact(time.time() if now is None else now)
+
+    # Per-device uptime %, start count and mean run length (seconds) in [start, end].
+    # Time before a device was first observed is not counted.
+    def stats(self, account, start, end=None):
+        end = time.time() if end is None else end
+        with self._lock:
+            account_number = self.account_index.get(account)
+            if account_number is None or not self.size:
+                return {'device_id': [], 'uptime_pct': np.empty(0), 'starts': np.empty(0, dtype=np.int64),
+                        'mean_run_seconds': np.empty(0)}
+            mask = (self.device_accounts[self.devices[:self.size]] == account_number) & (self.times[:self.size] <= end)
+            times = self.times[:self.size][mask]
+            devices = self.devices[:self.size][mask]
+            running = self.running[:self.size][mask]
+            first = self.first[:self.size][mask]
+            device_ids = list(self.device_ids)
+
+        order = np.lexsort((times, devices))
+        times, devices, running, first = times[order], devices[order], running[order], first[order]
+
+        # Each event's state lasts until the device's next event, or the window end
+        next_times = np.empty_like(times)
+        next_times[:-1] = times[1:]
+        next_times[-1:] = end
+        last_of_device = np.ones(len(devices), dtype=bool)
+        last_of_device[:-1] = devices[1:] != devices[:-1]
+        next_times[last_of_device] = end
+
+        lengths = np.clip(np.minimum(next_times, end) - np.maximum(times, start), 0, None)
+        is_running = running == 1
+
+        numbers, inverse = np.unique(devices, return_inverse=True)
+        observed = np.bincount(inverse, weights=lengths, minlength=len(numbers))
+        uptime = np.bincount(inverse, weights=lengths * is_running, minlength=len(numbers))
+        in_window = (times >= start) & (times <= end)
+        starts = np.bincount(inverse, weights=in_window & is_running & ~first, minlength=len(numbers)).astype(np.int64)
+        runs = np.bincount(inverse, weights=is_running & (lengths > 0), minlength=len(numbers))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            uptime_pct = np.where(observed > 0, 100.0 * uptime / observed, 0.0)
+            mean_run = np.where(runs > 0, uptime / runs, 0.0)
+        return {
+            'device_id': [device_ids[number] for number in numbers],
+            'uptime_pct': uptime_pct,
+            'starts': starts,
+            'mean_run_seconds': mean_run,
+        }
+
+    def memory_bytes(self):
+        return sum(getattr(self, name).nbytes for name in ('times', 'devices', 'running', 'first',
+                                                            'last_running', 'device_accounts'))
+
+
+# Process-wide history shared by every session
+status_history = StatusHistory()
@@ -1,140 +1,463 @@
+import datetime
+import sqlite3
 import streamlit as st
 import time
-from modules.utils import API_ROOT_URL, get_iot_devices, get_device_status, update_task  # Import functions
-
-# Loader CSS (can be injected globally)
-LOADER_CSS = """
-    <style>
-    .loader {
-        border: 16px solid #f3f3f3;
-        border-radius: 50%;
-        border-top: 16px solid #3498db;
-        width: 120px;
-        height: 120px;
-        animation: spin 2s linear infinite;
-        margin: auto;
-        position: absolute;
-        top: 50%;
-        left: 50%;
-        transform: translate(-50%, -50%);
-    }
-    .button {
-        background-color: #3498db; /* Blue */
-        border: none;
-        color: white;
-        padding: 10px 20px;
-        text-align: center;
-        text-decoration: none;
-        display: inline-block;
-        font-size: 16px;
-        margin: 4px 2px;
-        cursor: pointer;
-        border-radius: 5px;
-        transition: background-color 0.3s;
-    }
-    .button:hover {
-        background-color: #2980b9; /* Darker blue */
-    }
-    .device-name {
-        font-weight: bold;
-        margin: 5px 0;
-    }
-    .device-status {
-        font-size: 14px;
-        color: #555;
-    }
-    </style>
-"""
+import zoneinfo
+from modules.cache import cached_iot_devices, cached_device_status, cached_update_task, invalidate_user, live_device_status, is_cached
+from modules.fetch import fetch_concurrently, get_fetch_executor
+from modules.snapshot_store import load_snapshot
+from modules.fleet import Fleet
+from modules.bulk import bulk_update
+from modules.metrics import timed_page
+from modules.commands import submit_command, reconcile_commands, pending_overrides
+from modules.history import status_history
+from modules.job_queue import enqueue_jobs, list_jobs, count_jobs, cancel_jobs
+from modules.login import logout, session_token_manager
+from modules.tokens import is_unauthorized
+from modules.utils import SESSION_EXPIRED_MESSAGE
+
+# Fleets larger than this are shown as a table when the view is 'Auto'
+TABLE_MODE_THRESHOLD = 30
+VIEW_MODES = ['Auto', 'Table', 'Buttons']
+PAGE_SIZES = [25, 50, 100, 250]
+
+# Default live status refresh interval in seconds
+LIVE_REFRESH_INTERVAL = 10
+
+# How often (seconds) pending optimistic commands are checked for completion
+PENDING_POLL_INTERVAL = 1
 
+# How often (seconds) a background revalidation is checked while the saved snapshot is shown
+REVALIDATION_POLL_INTERVAL = 1
 
+# Windows offered by the uptime history panel, in seconds
+HISTORY_WINDOWS = {'Last hour': 3600, 'Last 24 hours': 86400, 'Last 7 days': 7 * 86400}
 
-# Function to show loader while page is processing
+# Function to show loader while page is processing (styled by the app CSS)
 def show_loader():
-    st.markdown(LOADER_CSS, unsafe_allow_html=True)
     st.markdown('<div class="loader"></div>', unsafe_allow_html=True)
 
-# Function to make the login API call
-def login_api_call(mobile, password):
+# Function to render one block of start/stop buttons per device
+def render_device_list(fleet, devices, mobile, jwt_token, changed=(), optimistic=False, stale=False, read_only=False):
+    for device in devices:
+        device_id = device.id
+        display_name = device.display_name  # Show device_label or device_id
+
+        # Get the status from the `get_task` API response
+        device_status = fleet.status_of(device_id)
+
+        st.markdown(f"<div class='device-name'>Device: {display_name}</div>", unsafe_allow_html=True)
+        updated = " (stale)" if stale else " (updated)" if device_id in changed else ""
+        st.markdown(f"<div class='device-status'>Status: {device_status}{updated}</div>", unsafe_allow_html=True)
+
+        if read_only:
+            st.write("<br>", unsafe_allow_html=True)  # Add spacing between devices
+            continue
+
+        # Display start and stop buttons for each device
+        col1, col2 = st.columns(2)
+
+        if optimistic:
+            # Commands are sent in the background from the click callback
+            pending = st.session_state.setdefault('pending_commands', {})
+            in_flight = device_id in pending
+            col1.button(f"Start {display_name}", key=f"start_{device_id}", disabled=in_flight or device_status == 'STARTED',
+                        on_click=submit_command, args=(pending, device_id, jwt_token, mobile, 30, device_status))
+            col2.button(f"Stop {display_name}", key=f"stop_{device_id}", disabled=in_flight or device_status == 'STOPPED',
+                        on_click=submit_command, args=(pending, device_id, jwt_token, mobile, 0, device_status))
+            st.write("<br>", unsafe_allow_html=True)  # Add spacing between devices
+            continue
+
+        with col1:
+            if device_status == 'STARTED':
+                st.markdown(f"""
+                    <button class='button' disabled>Start {display_name}</button>
+                    <p>{display_name} is already started</p>
+                """, unsafe_allow_html=True)
+            else:
+                if st.button(f"Start {display_name}", key=f"start_{device_id}"):
+                    # Show loading spinner immediately
+                    show_loader()
+                    start_response = cached_update_task(device_id, jwt_token, mobile, duration=30)  # Start for 30 minutes
+                    st.success(start_response.get('message', 'Device started successfully!'))
+                    st.rerun()  # Refresh the page to update statuses
+
+        with col2:
+            if device_status == 'STOPPED':
+                st.markdown(f"""
+                    <button class='button' disabled>Stop {display_name}</button>
+                    <p>{display_name} is already stopped</p>
+                """, unsafe_allow_html=True)
+            else:
+                if st.button(f"Stop {display_name}", key=f"stop_{device_id}"):
+                    # Show loading spinner immediately
+                    show_loader()
+                    stop_response = cached_update_task(device_id, jwt_token, mobile, duration=0)  # Stop the device
+                    st.success(stop_response.get('message', 'Device stopped successfully!'))
+                    st.rerun()  # Refresh the page to update statuses
+
+        st.write("<br>", unsafe_allow_html=True)  # Add spacing between devices
+
+# Function to render the bulk start/stop controls for the filtered devices;
+# individual devices are picked from the visible page (or the table selection)
+def bulk_actions_panel(fleet, filtered, visible, mobile, jwt_token, selected=()):
+    # Show the outcome of the previous bulk command, kept across the rerun
+    report = st.session_state.pop('bulk_report', None)
+    if report is not None:
+        if report.ok:
+            st.success(f"Bulk {report.action}: {len(report.succeeded)} of {report.total} devices done in {report.elapsed:.1f}s")
+        else:
+            st.error(f"Bulk {report.action}: {len(report.failed)} of {report.total} devices failed")
+            st.json(report.failed, expanded=False)
+
+    # Open the panel whenever the table selection changes
+    selected = list(selected)
+    if selected and selected != st.session_state.get('bulk_table_selection'):
+        st.session_state['bulk_actions_panel'] = True
+    st.session_state['bulk_table_selection'] = selected
+
+    # Stateful expander: while it is closed none of its widgets are built
+    with st.expander("Bulk actions", key='bulk_actions_panel', on_change='rerun') as panel:
+        if not panel.open:
+            return
+        # In table mode the selection comes from the table rows; otherwise only
+        # the visible page is offered (plus what is already picked), so the
+        # options sent on each rerun stay page-sized
+        if not selected:
+            options = [device.id for device in visible]
+            options += [device_id for device_id in st.session_state.get('bulk_selection', [])
+                        if device_id not in options and fleet.get(device_id) is not None]
+            selected = st.multiselect(
+                "Devices on this page",
+                options,
+                format_func=lambda device_id: fleet.get(device_id).display_name,
+                key='bulk_selection',
+            )
+        else:
+            st.write(f"{len(selected)} devices selected in the table")
+        duration = st.number_input("Run for (minutes)", min_value=1, value=30, step=5, key='bulk_duration')
+
+        col1, col2, col3, col4 = st.columns(4)
+        device_ids, bulk_duration = None, None
+        if col1.button("Start selected", disabled=not selected):
+            device_ids, bulk_duration = selected, duration
+        if col2.button("Stop selected", disabled=not selected):
+            device_ids, bulk_duration = selected, 0
+        if col3.button(f"Start all filtered ({len(filtered)})", disabled=not filtered):
+            device_ids, bulk_duration = [d.id for d in filtered if fleet.status_of(d.id) != 'STARTED'], duration
+        if col4.button(f"Stop all filtered ({len(filtered)})", disabled=not filtered):
+            device_ids, bulk_duration = [d.id for d in filtered if fleet.status_of(d.id) != 'STOPPED'], 0
+
+        if device_ids is not None:
+            progress = st.progress(0.0, text="Sending commands...")
+
+            def on_progress(done, total, device_id, response):
+                progress.progress(done / total, text=f"{done}/{total}: {fleet.get(device_id).display_name}")
+
+            st.session_state['bulk_report'] = bulk_update(device_ids, jwt_token, mobile, bulk_duration, on_progress=on_progress,
+                                                          token_manager=session_token_manager())
+            st.rerun()  # Refresh the page to update statuses
+
+# Function to get the browser's time zone, or None (the server's zone) when the browser did not report one
+def browser_timezone():
     try:
-        url = f'{API_ROOT_URL}/validate_user'
-        payload = {'mobile': mobile, 'password': password}
-        response = requests.post(url, json=payload)
+        return zoneinfo.ZoneInfo(st.context.timezone) if st.context.timezone else None
+    except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+        return None
+
+# Function to render the scheduled command form and the account's job list.
+# Jobs are only written to the local queue here; the worker thread sends them.
+# Times are entered and shown in the browser's time zone.
+def scheduled_commands_panel(fleet, filtered, visible, mobile, jwt_token):
+    # Stateful expander: while it is closed the job queue is not read at all
+    with st.expander("Scheduled commands", key='scheduled_commands_panel', on_change='rerun') as panel:
+        if not panel.open:
+            return
+        timezone = browser_timezone()
+        zone_name = st.context.timezone if timezone is not None else "server time"
+        now = datetime.datetime.now(timezone)
+        with st.form("schedule_form"):
+            # Only the visible page is offered (plus what is already picked), as in the bulk panel
+            options = [device.id for device in visible]
+            options += [device_id for device_id in st.session_state.get('schedule_selection', [])
+                        if device_id not in options and fleet.get(device_id) is not None]
+            device_ids = st.multiselect(
+                "Devices on this page (leave empty for all filtered devices)",
+                options,
+                format_func=lambda device_id: fleet.get(device_id).display_name,
+                key='schedule_selection',
+            )
+            action = st.radio("Action", ['Start', 'Stop'], horizontal=True)
+            col1, col2, col3 = st.columns(3)
+            run_date = col1.date_input("Date", value=now.date(), key='schedule_date')
+            run_time = col2.time_input(f"Time ({zone_name})", value=now.replace(minute=0, second=0, microsecond=0).time(),
+                                       key='schedule_time')
+            hours = col3.number_input("Run for (hours)", min_value=0.5, value=8.0, step=0.5)
+            submitted = st.form_submit_button("Schedule")
+
+        if submitted:
+            run_at = datetime.datetime.combine(run_date, run_time, tzinfo=timezone).timestamp()
+            targets = device_ids or [device.id for device in filtered]
+            duration = int(hours * 60) if action == 'Start' else 0
+            try:
+                count = enqueue_jobs(mobile, jwt_token, targets, duration, run_at)
+                st.success(f"Scheduled {action.lower()} for {count} devices")
+            except ValueError as e:
+                st.error(str(e))
+
+        counts = count_jobs(mobile)
+        if counts:
+            st.caption(", ".join(f"{status}: {count}" for status, count in sorted(counts.items())))
+            jobs = list_jobs(mobile)
+            st.dataframe({
+                'Device': [getattr(fleet.get(job['device_id']), 'display_name', job['device_id']) for job in jobs],
+                'Action': ['Start' if job['duration'] > 0 else 'Stop' for job in jobs],
+                'Minutes': [job['duration'] for job in jobs],
+                f'Run at ({zone_name})': [datetime.datetime.fromtimestamp(job['run_at'], timezone).strftime('%Y-%m-%d %H:%M')
+                                          for job in jobs],
+                'Status': [job['status'] for job in jobs],
+                'Attempts': [job['attempts'] for job in jobs],
+                'Error': [job['last_error'] or '' for job in jobs],
+            }, hide_index=True)
+            if counts.get('pending') and st.button("Cancel all pending", key='cancel_pending_jobs'):
+                cancel_jobs(mobile)
+                st.rerun()
 
-        if response.status_code == 200:
-            return response.json()  # Assuming the API returns a jwt_token on success
+# Function to render uptime analytics for the visible devices from the recorded status history
+def uptime_history_panel(fleet, devices, mobile):
+    # Stateful expander: the stats table is only built while it is open
+    with st.expander("Uptime history", key='uptime_history_panel', on_change='rerun') as panel:
+        if not panel.open:
+            return
+        window_label = st.selectbox("Window", list(HISTORY_WINDOWS), key='history_window')
+        stats = status_history.stats(mobile, time.time() - HISTORY_WINDOWS[window_label])
+        positions = {device_id: index for index, device_id in enumerate(stats['device_id'])}
+        rows = [(device, positions[device.id]) for device in devices if device.id in positions]
+        if not rows:
+            st.caption("No status history recorded for these devices yet.")
+            return
+
+        names = [device.display_name for device, _ in rows]
+        index = [position for _, position in rows]
+        uptime = stats['uptime_pct'][index].round(1)
+        st.bar_chart({'Uptime %': dict(zip(names, uptime))})
+        st.dataframe({
+            'Device': names,
+            'Uptime %': uptime,
+            'Starts': stats['starts'][index],
+            'Mean run (min)': (stats['mean_run_seconds'][index] / 60).round(1),
+        }, hide_index=True)
+
+# Function to render the search, status filter and view controls; returns the matching devices
+def device_filters(fleet):
+    col1, col2, col3 = st.columns([3, 2, 2])
+    query = col1.text_input("Search", placeholder="Device name or id", key='device_search')
+    status_options = ['All'] + sorted(fleet.count_by_status())
+    status_filter = col2.selectbox("Status", status_options, key='device_status_filter')
+    view = col3.selectbox("View", VIEW_MODES, key='device_view')
+
+    filtered = fleet.filter(query, None if status_filter == 'All' else status_filter)
+    if view == 'Auto':
+        view = 'Table' if len(fleet) > TABLE_MODE_THRESHOLD else 'Buttons'
+    return filtered, view
+
+# Function to slice the filtered devices down to the page being shown
+def paginate(devices, key='device'):
+    col1, col2 = st.columns([1, 3])
+    page_size = col1.selectbox("Per page", PAGE_SIZES, key=f'{key}_page_size')
+    page_count = max(1, -(-len(devices) // page_size))
+    page = col2.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1, key=f'{key}_page')
+    page = min(page, page_count)
+    return devices[(page - 1) * page_size:page * page_size]
+
+# Function to render the visible page of devices as a single selectable table; returns the selected ids
+def render_device_table(fleet, devices, changed=(), stale=False):
+    rows = {
+        'Device': [device.display_name for device in devices],
+        'ID': [device.id for device in devices],
+        'Status': [fleet.status_of(device.id) for device in devices],
+    }
+    if changed:
+        rows['Updated'] = ['●' if device.id in changed else '' for device in devices]
+    if stale:
+        rows['Stale'] = ['yes'] * len(devices)
+    event = st.dataframe(
+        rows,
+        hide_index=True,
+        width='stretch',
+        on_select='rerun',
+        selection_mode='multi-row',
+        key='device_table',
+    )
+    return [devices[row].id for row in event.selection.rows if row < len(devices)]
+
+# Function to render the filters, bulk actions and device list for one status snapshot.
+# In live mode this runs as a fragment: each tick re-polls only get_task and
+# reuses the device list fetched by the last full run.
+# With `snapshot_state` set the lists come from the on-disk snapshot: 'stale'
+# while a background revalidation runs, 'offline' (read-only) when the API is down.
+def device_section(mobile, jwt_token, devices_response, status_response, live_interval=None, optimistic=False,
+                   snapshot_state=None, revalidation=None):
+    if revalidation is not None and all(future.done() for future in revalidation.values()):
+        st.rerun()  # Fresh data is in the cache now
+    stale = snapshot_state is not None
+    read_only = snapshot_state == 'offline'
+
+    previous = st.session_state.get('fleet')
+    if live_interval:
+        polled = live_device_status(mobile, jwt_token, max_age=live_interval / 2)
+        if isinstance(polled, list):
+            status_response = polled
         else:
-            return {"success": False, "message": "Invalid mobile number or password"}
-    except Exception as e:
-        return {"success": False, "message": f"API request failed: {str(e)}"}
+            st.warning(polled.get('message', 'Failed to refresh device statuses'))
+
+    # Index devices and statuses by id; status refreshes reuse the device index
+    if previous is not None and previous.devices.keys() == {device['id'] for device in devices_response}:
+        fleet = previous.with_statuses(status_response)
+    else:
+        fleet = Fleet.from_responses(devices_response, status_response)
+    st.session_state['fleet'] = fleet
+    if not stale:
+        status_history.record(mobile, status_response)
+
+    # Settle finished optimistic commands, then show the rest as STARTING/STOPPING
+    pending = st.session_state.setdefault('pending_commands', {})
+    for error in st.session_state.pop('command_errors', []):
+        st.error(f"Command rolled back - {error}")
+    if pending:
+        errors = reconcile_commands(pending, mobile, jwt_token, lambda device_id: getattr(fleet.get(device_id), 'display_name', device_id))
+        if not pending and not live_interval:
+            # Everything settled: one full rerun stops the reconciliation timer
+            st.session_state['command_errors'] = errors
+            st.rerun()
+        for error in errors:
+            st.error(f"Command rolled back - {error}")
+        fleet = fleet.with_overrides(pending_overrides(pending))
+
+    changed = set()
+    if live_interval and previous is not None:
+        changed = {device_id for device_id, (old, new) in fleet.diff(previous).items() if old is not None and new is not None}
+        st.caption(f"Live status: refreshed every {live_interval}s, {len(changed)} changed since last refresh")
+
+    # Only the visible page of the filtered devices is rendered
+    filtered, view = device_filters(fleet)
+    visible = paginate(filtered)
+    if view == 'Table':
+        selected = render_device_table(fleet, visible, changed, stale)
+        if not read_only:
+            bulk_actions_panel(fleet, filtered, visible, mobile, jwt_token, selected)
+            scheduled_commands_panel(fleet, filtered, visible, mobile, jwt_token)
+    else:
+        if not read_only:
+            bulk_actions_panel(fleet, filtered, visible, mobile, jwt_token)
+            scheduled_commands_panel(fleet, filtered, visible, mobile, jwt_token)
+        render_device_list(fleet, visible, mobile, jwt_token, changed, optimistic, stale, read_only)
+    uptime_history_panel(fleet, visible, mobile)
+
+# Function to load the account's on-disk snapshot, or None if there is none or the store is unusable
+def load_saved_snapshot(mobile):
+    try:
+        return load_snapshot(mobile)
+    except (sqlite3.Error, OSError, ValueError):
+        return None
+
+# Function to show the saved snapshot read-only when the API cannot be reached
+def render_offline(mobile, jwt_token, message):
+    snapshot = load_saved_snapshot(mobile)
+    if snapshot is None:
+        st.error(message)
+        return
+    saved_at = time.strftime('%Y-%m-%d %H:%M', time.localtime(snapshot['updated_at']))
+    st.warning(f"{message}. Showing saved data from {saved_at} (read-only).")
+    device_section(mobile, jwt_token, snapshot['devices'], snapshot['statuses'], snapshot_state='offline')
+
+# Function to render freshly fetched page data, falling back to the saved snapshot on errors
+def render_fetched(mobile, jwt_token, page_data, live_interval, optimistic):
+    devices_response = page_data['devices']
+    status_response = page_data['statuses']
+
+    if 'devices' in page_data['errors']:
+        render_offline(mobile, jwt_token, page_data['errors']['devices'])
+    elif isinstance(devices_response, list):  # Assuming the devices are returned as a list
+        if 'statuses' in page_data['errors']:
+            render_offline(mobile, jwt_token, page_data['errors']['statuses'])
+        elif isinstance(status_response, list):  # Assuming statuses are returned as a list
+            # Re-run only the device section on a timer, not the whole script,
+            # while live refresh is on or optimistic commands await reconciliation
+            run_every = live_interval or (PENDING_POLL_INTERVAL if st.session_state.get('pending_commands') else None)
+            if run_every:
+                st.fragment(device_section, run_every=run_every)(mobile, jwt_token, devices_response, status_response, live_interval, optimistic)
+            else:
+                device_section(mobile, jwt_token, devices_response, status_response, live_interval, optimistic)
+    else:
+        st.write("No IoT devices found or invalid response format.")
 
 # Function to display the IoT devices after login and provide start/stop controls
+@timed_page
 def iot_device_page():
     st.title("Your Registered Devices")
 
-    # Get mobile and jwt_token from session state
+    # Get mobile and jwt_token from session state; the token is renewed ahead of expiry when possible
     mobile = st.session_state.get('mobile')
-    jwt_token = st.session_state.get('jwt_token')
+    token_manager = session_token_manager()
+    jwt_token = token_manager.get()
+    if token_manager.expired():
+        logout(SESSION_EXPIRED_MESSAGE)
+        st.rerun()
+    if jwt_token != st.session_state['jwt_token']:
+        invalidate_user(mobile, st.session_state['jwt_token'])
+        st.session_state['jwt_token'] = jwt_token
 
-    # Fetch the IoT devices using the API call
-    devices_response = get_iot_devices(mobile, jwt_token)
-    status_response = get_device_status(mobile, jwt_token)  # Fetch device statuses on page load
+    # Live status refresh settings
+    live = st.sidebar.toggle("Live status refresh", key='live_status')
+    live_interval = None
+    if live:
+        live_interval = st.sidebar.number_input("Refresh every (seconds)", min_value=2, value=LIVE_REFRESH_INTERVAL, key='live_interval')
+    optimistic = st.sidebar.toggle("Optimistic controls", key='optimistic_controls')
+    # Reads go through the token manager, which retries once with a renewed token after a 401
+    devices_call = (token_manager.wrap(cached_iot_devices), (mobile, jwt_token))
+    if live:
+        status_call = (token_manager.wrap(live_device_status), (mobile, jwt_token, live_interval / 2))
+    else:
+        status_call = (token_manager.wrap(cached_device_status), (mobile, jwt_token))
 
-    if 'message' in devices_response:
-        st.error(devices_response['message'])
-    elif isinstance(devices_response, list):  # Assuming the devices are returned as a list
-        if 'message' in status_response:
-            st.error(status_response['message'])
-        elif isinstance(status_response, list):  # Assuming statuses are returned as a list
-            for device in devices_response:
-                device_label = device.get('device_label')
-                device_id = device['id']
-                display_name = device_label if device_label else device_id  # Show device_label or device_id
-
-                # Get the status from the `get_task` API response
-                device_status = next((status['action'] for status in status_response if status['id'] == device_id), 'UNKNOWN')
-
-                st.markdown(f"<div class='device-name'>Device: {display_name}</div>", unsafe_allow_html=True)
-                st.markdown(f"<div class='device-status'>Status: {device_status}</div>", unsafe_allow_html=True)
-
-                # Display start and stop buttons for each device
-                col1, col2 = st.columns(2)
-
-                with col1:
-                    if device_status == 'STARTED':
-                        st.markdown(f"""
-                            <button class='button' disabled>Start {display_name}</button>
-                            <p>{display_name} is already started</p>
-                        """, unsafe_allow_html=True)
-                    else:
-                        if st.button(f"Start {display_name}", key=f"start_{device_id}"):
-                            # Show loading spinner immediately
-                            show_loader()
-                            start_response = update_task(device_id, jwt_token, mobile, duration=30)  # Start for 30 minutes
-                            st.success(start_response.get('message', 'Device started successfully!'))
-                            st.rerun()  # Refresh the page to update statuses
-
-                with col2:
-                    if device_status == 'STOPPED':
-                        st.markdown(f"""
-                            <button class='button' disabled>Stop {display_name}</button>
-                            <p>{display_name} is already stopped</p>
-                        """, unsafe_allow_html=True)
-                    else:
-                        if st.button(f"Stop {display_name}", key=f"stop_{device_id}"):
-                            # Show loading spinner immediately
-                            show_loader()
-                            stop_response = update_task(device_id, jwt_token, mobile, duration=0)  # Stop the device
-                            st.success(stop_response.get('message', 'Device stopped successfully!'))
-                            st.rerun()  # Refresh the page to update statuses
-
-                st.write("<br>", unsafe_allow_html=True)  # Add spacing between devices
+    # Stale-while-revalidate: with nothing cached (server restart, new login) render
+    # the on-disk snapshot at once and fetch fresh data in the background
+    snapshot = None
+    revalidation = st.session_state.get('revalidation')
+    if 'revalidation' not in st.session_state and not is_cached(mobile, jwt_token):
+        snapshot = load_saved_snapshot(mobile)
+        if snapshot is not None:
+            executor = get_fetch_executor()
+            revalidation = {
+                'devices': executor.submit(devices_call[0], *devices_call[1]),
+                'statuses': executor.submit(token_manager.wrap(cached_device_status), mobile, jwt_token),
+            }
+        st.session_state['revalidation'] = revalidation  # Only once per login
+    elif revalidation is not None:
+        if all(future.done() for future in revalidation.values()):
+            st.session_state['revalidation'] = revalidation = None
+        else:
+            snapshot = load_saved_snapshot(mobile)
+
+    if snapshot is not None:
+        saved_at = time.strftime('%Y-%m-%d %H:%M', time.localtime(snapshot['updated_at']))
+        st.info(f"Showing saved data from {saved_at} while fresh data loads...")
+        st.fragment(device_section, run_every=REVALIDATION_POLL_INTERVAL)(
+            mobile, jwt_token, snapshot['devices'], snapshot['statuses'], snapshot_state='stale', revalidation=revalidation)
     else:
-        st.write("No IoT devices found or invalid response format.")
+        # Fetch the IoT devices and their statuses concurrently
+        page_data = fetch_concurrently({
+            'devices': devices_call,
+            'statuses': status_call,  # Fetch device statuses on page load
+        })
+        if is_unauthorized(page_data['devices']) or is_unauthorized(page_data['statuses']):
+            # Rejected even after a renewal attempt: the user has to log in again
+            logout(SESSION_EXPIRED_MESSAGE)
+            st.rerun()
+        render_fetched(mobile, token_manager.jwt_token, page_data, live_interval, optimistic)
 
     # Provide a logout button
     if st.button("Logout"):
-        if 'jwt_token' in st.session_state:
-            del st.session_state['jwt_token']
-        if 'mobile' in st.session_state:
-            del st.session_state['mobile']
+        logout()
         st.rerun()  # Refresh the page after logout
@@ -0,0 +1,278 @@
+# modules/job_queue.py
+
+from functools import lru_cache
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from modules.bulk import bulk_update
+from modules.snapshot_store import connect_private
+from modules.tokens import renewable_manager, token_expired, token_expiry
+
+# Where scheduled start/stop commands are kept
+JOBS_DB_PATH = os.environ.get('MANAGERR_JOBS_DB', os.path.join(os.path.expanduser('~'), '.managerr', 'jobs.db'))
+
+# Worker settings: how often it looks for due jobs, how many it claims at once, retry policy
+JOB_POLL_INTERVAL = float(os.environ.get('MANAGERR_JOB_POLL_INTERVAL', 1))
+JOB_BATCH_SIZE = int(os.environ.get('MANAGERR_JOB_BATCH_SIZE', 500))
+JOB_MAX_ATTEMPTS = int(os.environ.get('MANAGERR_JOB_MAX_ATTEMPTS', 5))
+JOB_RETRY_BACKOFF = float(os.environ.get('MANAGERR_JOB_RETRY_BACKOFF', 30))
+
+# Seconds a claimed job may stay 'running' before a worker assumes its process
+# died and queues it again; must be longer than one batch takes to send
+JOB_LEASE = float(os.environ.get('MANAGERR_JOB_LEASE', 900))
+
+# Job states
+PENDING, RUNNING, DONE, FAILED, SUPERSEDED, CANCELLED = 'pending', 'running', 'done', 'failed', 'superseded', 'cancelled'
+
+# Error stored on jobs whose login had expired by the time they ran; retrying cannot help
+JOB_LOGIN_EXPIRED_MESSAGE = "Login expired before the job ran; log in with 'Keep me signed in' and schedule it again"
+
+logger = logging.getLogger(__name__)
+
+_schema_ready = set()
+_schema_lock = threading.Lock()
+
+
+# Function to open the job database, creating it on first use
+def connect(path=None):
+    path = path or JOBS_DB_PATH
+    connection = connect_private(path, timeout=10)  # Holds bearer tokens
+    connection.row_factory = sqlite3.Row
+    with _schema_lock:
+        if path not in _schema_ready:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.executescript('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    mobile TEXT NOT NULL,
+                    jwt_token TEXT NOT NULL,
+                    device_id TEXT NOT NULL,
+                    duration INTEGER NOT NULL,
+                    run_at REAL NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    last_error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS jobs_due ON jobs (status, next_attempt_at);
+                CREATE INDEX IF NOT EXISTS jobs_device ON jobs (mobile, device_id, status);
+            ''')
+            connection.commit()
+            _schema_ready.add(path)
+    return connection
+
+# Function to schedule one command per device; duration > 0 starts for that many
+# minutes, 0 stops. A pending job for the same device and run time is superseded.
+# Returns the number of jobs created. Raises ValueError when the token expires
+# before `run_at` and the account's login cannot be renewed in the background.
+def enqueue_jobs(mobile, jwt_token, device_ids, duration, run_at=None, path=None):
+    now = time.time()
+    run_at = now if run_at is None else run_at
+    expires_at = token_expiry(jwt_token)
+    if expires_at is not None and run_at >= expires_at and renewable_manager(mobile) is None:
+        raise ValueError(f"Your login expires at {time.strftime('%Y-%m-%d %H:%M', time.localtime(expires_at))}. "
+                         "Schedule an earlier time, or log in with 'Keep me signed in'.")
+    device_ids = list(dict.fromkeys(device_ids))
+    connection = connect(path)
+    try:
+        with connection:
+            connection.executemany(
+                "UPDATE jobs SET status = ?, jwt_token = '', updated_at = ? WHERE mobile = ? AND device_id = ? AND status = ? AND run_at = ?",
+                [(SUPERSEDED, now, mobile, device_id, PENDING, run_at) for device_id in device_ids],
+            )
+            connection.executemany(
+                'INSERT INTO jobs (mobile, jwt_token, device_id, duration, run_at, status, next_attempt_at, created_at, updated_at)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [(mobile, jwt_token, device_id, int(duration), run_at, PENDING, run_at, now, now) for device_id in device_ids],
+            )
+    finally:
+        connection.close()
+    return len(device_ids)
+
+# Function to list an account's most recent jobs, newest run time first
+def list_jobs(mobile, limit=200, path=None):
+    connection = connect(path)
+    try:
+        rows = connection.execute(
+            'SELECT id, device_id, duration, run_at, status, attempts, last_error FROM jobs'
+            ' WHERE mobile = ? ORDER BY run_at DESC, id DESC LIMIT ?', (mobile, limit),
+        ).fetchall()
+    finally:
+        connection.close()
+    return [dict(row) for row in rows]
+
+# Function to count an account's jobs per state
+def count_jobs(mobile, path=None):
+    connection = connect(path)
+    try:
+        rows = connection.execute('SELECT status, COUNT(*) FROM jobs WHERE mobile = ? GROUP BY status', (mobile,)).fetchall()
+    finally:
+        connection.close()
+    return {status: count for status, count in rows}
+
+# Function to cancel an account's pending jobs (all, or only the given ids)
+def cancel_jobs(mobile, job_ids=None, path=None):
+    connection = connect(path)
+    try:
+        with connection:
+            if job_ids is None:
+                cursor = connection.execute("UPDATE jobs SET status = ?, jwt_token = '', updated_at = ? WHERE mobile = ? AND status = ?",
+                                            (CANCELLED, time.time(), mobile, PENDING))
+            else:
+                cursor = connection.executemany("UPDATE jobs SET status = ?, jwt_token = '', updated_at = ? WHERE mobile = ? AND status = ? AND id = ?",
+                                                [(CANCELLED, time.time(), mobile, PENDING, job_id) for job_id in job_ids])
+            return cursor.rowcount
+    finally:
+        connection.close()
+
+# Function to claim due jobs for execution. Of several due jobs for the same
+# device only the latest one runs; the older ones are marked superseded.
+def claim_due_jobs(limit=JOB_BATCH_SIZE, path=None):
+    now = time.time()
+    connection = connect(path)
+    try:
+        connection.execute('BEGIN IMMEDIATE')
+        rows = connection.execute(
+            'SELECT * FROM jobs WHERE status = ? AND next_attempt_at <= ? ORDER BY next_attempt_at LIMIT ?',
+            (PENDING, now, limit),
+        ).fetchall()
+
+        latest = {}
+        for row in rows:
+            key = (row['mobile'], row['device_id'])
+            if key not in latest or (row['run_at'], row['id']) > (latest[key]['run_at'], latest[key]['id']):
+                latest[key] = row
+        claimed = list(latest.values())
+        claimed_ids = {row['id'] for row in claimed}
+
+        connection.executemany("UPDATE jobs SET status = ?, jwt_token = '', updated_at = ? WHERE id = ?",
+                               [(SUPERSEDED, now, row['id']) for row in rows if row['id'] not in claimed_ids])
+        connection.executemany('UPDATE jobs SET status = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?',
+                               [(RUNNING, now, row['id']) for row in claimed])
+        connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+    return [dict(row, attempts=row['attempts'] + 1) for row in claimed]
+
+# Function to store the outcome of executed jobs. `failed` holds (job, error, terminal)
+# tuples; failures are retried with exponential backoff until JOB_MAX_ATTEMPTS
+# is reached, terminal ones (e.g. an expired login) fail at once. The stored
+# token is wiped from every job that will not run again.
+def complete_jobs(succeeded, failed, path=None):
+    now = time.time()
+    connection = connect(path)
+    try:
+        with connection:
+            connection.executemany("UPDATE jobs SET status = ?, jwt_token = '', last_error = NULL, updated_at = ? WHERE id = ?",
+                                   [(DONE, now, job['id']) for job in succeeded])
+            retried = [(job, error) for job, error, terminal in failed if not terminal and job['attempts'] < JOB_MAX_ATTEMPTS]
+            final = [(job, error) for job, error, terminal in failed if terminal or job['attempts'] >= JOB_MAX_ATTEMPTS]
+            connection.executemany(
+                'UPDATE jobs SET status = ?, last_error = ?, next_attempt_at = ?, updated_at = ? WHERE id = ?',
+                [(PENDING, error, now + JOB_RETRY_BACKOFF * (2 ** (job['attempts'] - 1)), now, job['id']) for job, error in retried],
+            )
+            connection.executemany(
+                "UPDATE jobs SET status = ?, jwt_token = '', last_error = ?, updated_at = ? WHERE id = ?",
+                [(FAILED, error, now, job['id']) for job, error in final],
+            )
+    finally:
+        connection.close()
+
+# Function to put jobs left 'running' by a crashed process back in the queue.
+# Only jobs claimed more than `lease` seconds ago are taken, so the jobs another
+# live process sharing the database is sending are not run twice.
+def recover_running_jobs(lease=JOB_LEASE, path=None):
+    now = time.time()
+    connection = connect(path)
+    try:
+        with connection:
+            return connection.execute('UPDATE jobs SET status = ?, updated_at = ? WHERE status = ? AND updated_at < ?',
+                                      (PENDING, now, RUNNING, now - lease)).rowcount
+    finally:
+        connection.close()
+
+# Function to execute one batch of due jobs; returns how many were run.
+# Credentials are resolved now, not when the job was queued: the account's
+# renewable token manager is used while its user is logged in with
+# 'Keep me signed in', otherwise the stored token if it is still valid.
+def run_due_jobs(path=None):
+    jobs = claim_due_jobs(path=path)
+    if not jobs:
+        return 0
+
+    # One bulk command per account, token and duration
+    groups = {}
+    for job in jobs:
+        groups.setdefault((job['mobile'], job['jwt_token'], job['duration']), []).append(job)
+
+    succeeded, failed = [], []
+    for (mobile, jwt_token, duration), group in groups.items():
+        by_device = {job['device_id']: job for job in group}
+        manager = renewable_manager(mobile)
+        try:
+            if manager is not None:
+                report = bulk_update(list(by_device), manager.get(), mobile, duration, token_manager=manager)
+            elif token_expired(jwt_token):
+                failed.extend((job, JOB_LOGIN_EXPIRED_MESSAGE, True) for job in group)
+                continue
+            else:
+                report = bulk_update(list(by_device), jwt_token, mobile, duration)
+        except Exception as e:
+            # Left 'running' the jobs would wait for the lease; retry them like a failed send
+            logger.exception("Scheduled commands for %d devices failed", len(group))
+            failed.extend((job, f"Worker error: {e}", False) for job in group)
+            continue
+        succeeded.extend(by_device[device_id] for device_id in report.succeeded)
+        for device_id, message in report.failed.items():
+            if report.status_codes.get(device_id) == 401:
+                failed.append((by_device[device_id], JOB_LOGIN_EXPIRED_MESSAGE, True))
+            else:
+                failed.append((by_device[device_id], message, False))
+    complete_jobs(succeeded, failed, path=path)
+    return len(jobs)
+
+
+# Background thread that executes due jobs
+class JobWorker(threading.Thread):
+    def __init__(self, path=None, poll_interval=JOB_POLL_INTERVAL):
+        super().__init__(name='managerr-jobs', daemon=True)
+        self.path = path
+        self.poll_interval = poll_interval
+        self.stopped = threading.Event()
+
+    # Never exits on an error: ensure_worker() starts one worker per process,
+    # so a dead thread would leave every scheduled job unsent until a restart
+    def run(self):
+        next_recovery = 0.0
+        while not self.stopped.is_set():
+            ran = 0
+            try:
+                if time.monotonic() >= next_recovery:
+                    recover_running_jobs(path=self.path)
+                    next_recovery = time.monotonic() + JOB_LEASE / 3
+                ran = run_due_jobs(self.path)
+            except sqlite3.Error:
+                pass
+            except Exception:
+                logger.exception("Job worker iteration failed")
+            if not ran:
+                self.stopped.wait(self.poll_interval)
+
+    def stop(self):
+        self.stopped.set()
+
+
+# Function to start the scheduler worker once per process
+@lru_cache(maxsize=None)
+def ensure_worker():
+    worker = JobWorker()
+    worker.start()
+    return worker
@@ -1,9 +1,35 @@
 # modules/login.py
 
 import streamlit as st
+from modules.cache import invalidate_user
 from modules.utils import login_api_call, user_registry
+from modules.metrics import timed_page
+from modules.tokens import TokenManager, register_manager, unregister_manager
+
+# Function to get the session's token manager, creating one for the logged-in account if needed
+def session_token_manager():
+    manager = st.session_state.get('token_manager')
+    if manager is None or manager.mobile != st.session_state['mobile']:
+        manager = TokenManager(st.session_state['mobile'], st.session_state['jwt_token'])
+        st.session_state['token_manager'] = manager
+    return manager
+
+# Function to log out: forget the account's cached data and everything kept in the session for it
+def logout(notice=None):
+    if 'mobile' in st.session_state and 'jwt_token' in st.session_state:
+        invalidate_user(st.session_state['mobile'], st.session_state['jwt_token'])
+        unregister_manager(st.session_state['mobile'])  # Scheduled jobs fall back to their stored token
+    # Includes the account's device ids: pending commands, selections and the
+    # last fleet, which the next account to log in here must not inherit
+    for key in ('jwt_token', 'mobile', 'token_manager', 'revalidation', 'accounts', 'fleet',
+                'pending_commands', 'command_errors', 'bulk_report', 'bulk_selection', 'bulk_table_selection',
+                'schedule_selection', 'fleet_given_up', 'fleet_polling'):
+        st.session_state.pop(key, None)
+    if notice:
+        st.session_state['login_notice'] = notice  # Shown on the login page
 
 # Function to handle the registration page UI and interaction
+@timed_page
 def registration_page():
     st.title("User Registration")
 
@@ -26,17 +52,23 @@ def registration_page():
  # Add a 'Back' button to go back to the login page
     if st.button("Back to Login"):
         st.session_state['show_registration_page'] = False  # Redirect to the login page
-        st.experimental_rerun()  # Force rerun to update the UI
+        st.rerun()  # Force rerun to update the UI
 
 
 # Function to handle the login page UI and interaction
+@timed_page
 def login_page():
     st.title("Robo Rakhwala Login")
+    notice = st.session_state.pop('login_notice', None)
+    if notice:
+        st.warning(notice)
 
     # Input fields for mobile number and password inside a form
     with st.form("login_form"):
         mobile = st.text_input("Mobile Number", placeholder="Enter your mobile number")
         password = st.text_input("Password", type="password", placeholder="Enter your password")
+        remember = st.checkbox("Keep me signed in", help="Keeps your password in memory for this session "
+                                                         "so the login is renewed before it expires")
         login_button_clicked = st.form_submit_button("Login")
 
     # Perform login on button click
@@ -47,6 +79,9 @@ def login_page():
         if 'jwt_token' in auth_response:
             st.session_state['jwt_token'] = auth_response['jwt_token']
             st.session_state['mobile'] = mobile
+            token_manager = TokenManager(mobile, auth_response['jwt_token'], password if remember else None)
+            st.session_state['token_manager'] = token_manager
+            register_manager(token_manager)  # Lets scheduled jobs renew the login too
             st.success("Login Successful! Redirecting to IoT device list...")
             st.rerun()  # Use the new rerun method
         else:
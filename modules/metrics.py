@@ -0,0 +1,143 @@
+# modules/metrics.py
+
+from collections import Counter
+from functools import wraps
+import json
+import os
+import threading
+import time
+
+# Latency histogram bucket upper bounds in seconds (Prometheus style)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+
+# Off by default; every hook checks this flag first so disabled overhead is one attribute read
+enabled = os.environ.get('MANAGERR_DIAGNOSTICS', '').lower() in ('1', 'true', 'yes')
+
+
+# Fixed-bucket latency histogram
+class Histogram:
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.counts[index] += 1
+                break
+        self.total += seconds
+        self.count += 1
+
+    # Estimate a quantile (0-1) as the upper bound of the bucket it falls in
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, bucket_count in zip(LATENCY_BUCKETS, self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return bound if bound != float('inf') else LATENCY_BUCKETS[-2]
+        return LATENCY_BUCKETS[-2]
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': round(self.total, 6),
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'buckets': {str(bound): count for bound, count in zip(LATENCY_BUCKETS, self.counts)},
+        }
+
+
+_lock = threading.Lock()
+_request_latency = {}  # endpoint -> Histogram
+_status_codes = Counter()  # (endpoint, status) -> count
+_retries = Counter()  # endpoint -> count
+_render_latency = {}  # page -> Histogram
+
+# Function to switch instrumentation on or off for the whole process
+def set_enabled(value):
+    global enabled
+    enabled = bool(value)
+
+# Function to record one API request attempt; status is an HTTP code or 'error'
+def record_request(endpoint, seconds, status):
+    with _lock:
+        _request_latency.setdefault(endpoint, Histogram()).observe(seconds)
+        _status_codes[(endpoint, str(status))] += 1
+
+# Function to record a retried API request
+def record_retry(endpoint):
+    with _lock:
+        _retries[endpoint] += 1
+
+# Function to record how long a page function took to run
+def record_render(page, seconds):
+    with _lock:
+        _render_latency.setdefault(page, Histogram()).observe(seconds)
+
+# Function to forget everything recorded so far
+def reset():
+    with _lock:
+        _request_latency.clear()
+        _status_codes.clear()
+        _retries.clear()
+        _render_latency.clear()
+
+# Decorator to time a page function when instrumentation is enabled
+def timed_page(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not enabled:
+            return func(*args, **kwargs)
+        started_at = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            record_render(func.__name__, time.perf_counter() - started_at)
+    return wrapper
+
+# Function to get a consistent copy of all metrics
+def snapshot():
+    with _lock:
+        return {
+            'requests': {endpoint: histogram.to_dict() for endpoint, histogram in _request_latency.items()},
+            'status_codes': [{'endpoint': endpoint, 'status': status, 'count': count}
+                             for (endpoint, status), count in sorted(_status_codes.items())],
+            'retries': dict(_retries),
+            'renders': {page: histogram.to_dict() for page, histogram in _render_latency.items()},
+        }
+
+# Function to export all metrics as JSON
+def export_json():
+    return json.dumps(snapshot(), indent=2)
+
+# Function to export all metrics in the Prometheus text exposition format
+def export_prometheus():
+    lines = []
+
+    def histogram_lines(name, label, histograms):
+        lines.append(f'# TYPE {name} histogram')
+        for key, histogram in sorted(histograms.items()):
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, histogram.counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else bound
+                lines.append(f'{name}_bucket{{{label}="{key}",le="{le}"}} {cumulative}')
+            lines.append(f'{name}_sum{{{label}="{key}"}} {histogram.total}')
+            lines.append(f'{name}_count{{{label}="{key}"}} {histogram.count}')
+
+    with _lock:
+        histogram_lines('managerr_api_request_seconds', 'endpoint', _request_latency)
+        lines.append('# TYPE managerr_api_responses_total counter')
+        for (endpoint, status), count in sorted(_status_codes.items()):
+            lines.append(f'managerr_api_responses_total{{endpoint="{endpoint}",status="{status}"}} {count}')
+        lines.append('# TYPE managerr_api_retries_total counter')
+        for endpoint, count in sorted(_retries.items()):
+            lines.append(f'managerr_api_retries_total{{endpoint="{endpoint}"}} {count}')
+        histogram_lines('managerr_page_render_seconds', 'page', _render_latency)
+    return '\n'.join(lines) + '\n'
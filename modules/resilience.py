@@ -0,0 +1,284 @@
+# modules/resilience.py
+
+import asyncio
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import heapq
+import itertools
+import os
+import threading
+import time
+
+# Consecutive failures that open an endpoint's circuit, and how long it stays open
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get('MANAGERR_BREAKER_FAILURES', 5))
+BREAKER_RESET_TIMEOUT = float(os.environ.get('MANAGERR_BREAKER_RESET', 30))
+
+# Adaptive read deadline: this multiple of the observed p99, within [min, max]
+ADAPTIVE_TIMEOUT_MULTIPLIER = float(os.environ.get('MANAGERR_ADAPTIVE_TIMEOUT_MULTIPLIER', 3))
+ADAPTIVE_TIMEOUT_MIN = float(os.environ.get('MANAGERR_ADAPTIVE_TIMEOUT_MIN', 2))
+
+# Hedged reads: send a second request once the first is slower than the observed p95
+HEDGE_ENABLED = os.environ.get('MANAGERR_HEDGE', '1').lower() not in ('0', 'false', 'no')
+HEDGE_DEFAULT_DELAY = float(os.environ.get('MANAGERR_HEDGE_DELAY', 1.0))
+HEDGE_MIN_DELAY = 0.05
+
+# Hedge budget per endpoint: each read earns this fraction of a hedge, and at
+# most HEDGE_BUDGET_BURST unspent hedges are saved up
+HEDGE_BUDGET_RATIO = float(os.environ.get('MANAGERR_HEDGE_BUDGET', 0.1))
+HEDGE_BUDGET_BURST = float(os.environ.get('MANAGERR_HEDGE_BUDGET_BURST', 5))
+
+# Latency samples kept per endpoint, and samples needed before trusting percentiles
+LATENCY_WINDOW = 200
+LATENCY_MIN_SAMPLES = 20
+
+# Last known good responses kept for serving while a circuit is open
+SNAPSHOT_MAX_ENTRIES = 512
+
+
+# Raised instead of sending a request while an endpoint's circuit is open
+class CircuitOpenError(Exception):
+    pass
+
+
+# Closed -> open after repeated failures; after the reset timeout one probe is
+# let through (half-open) and its outcome closes or re-opens the circuit
+class CircuitBreaker:
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return 'open'
+        return 'half-open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+
+# Sliding window of recent successful request durations
+class LatencyTracker:
+    def __init__(self, window=LATENCY_WINDOW):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    # Percentile (0-100) of the window, or None until enough samples exist
+    def percentile(self, pct):
+        with self._lock:
+            if len(self._samples) < LATENCY_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+# Caps hedges at a fraction of requests, so a slow backend is not sent
+# (almost) twice the load exactly when it is struggling
+class HedgeBudget:
+    def __init__(self, ratio=HEDGE_BUDGET_RATIO, burst=HEDGE_BUDGET_BURST):
+        self.ratio = ratio
+        self.burst = burst
+        self._balance = burst
+        self._lock = threading.Lock()
+
+    # Credit one request
+    def deposit(self):
+        with self._lock:
+            self._balance = min(self.burst, self._balance + self.ratio)
+
+    # Take one hedge if the budget allows it
+    def withdraw(self):
+        with self._lock:
+            if self._balance < 1 - 1e-9:  # Ten deposits of 0.1 add up to 0.999...
+                return False
+            self._balance -= 1
+            return True
+
+
+_breakers = {}
+_latencies = {}
+_hedge_budgets = {}
+_snapshots = OrderedDict()
+_lock = threading.Lock()
+
+# Function to get the circuit breaker of an endpoint
+def get_breaker(endpoint):
+    with _lock:
+        if endpoint not in _breakers:
+            _breakers[endpoint] = CircuitBreaker()
+        return _breakers[endpoint]
+
+# Function to get the latency tracker of an endpoint
+def get_latency(endpoint):
+    with _lock:
+        if endpoint not in _latencies:
+            _latencies[endpoint] = LatencyTracker()
+        return _latencies[endpoint]
+
+# Function to get the hedge budget of an endpoint
+def get_hedge_budget(endpoint):
+    with _lock:
+        if endpoint not in _hedge_budgets:
+            _hedge_budgets[endpoint] = HedgeBudget()
+        return _hedge_budgets[endpoint]
+
+# Function to pick the read deadline of an endpoint from its observed p99
+def adaptive_read_timeout(endpoint, max_timeout):
+    p99 = get_latency(endpoint).percentile(99)
+    if p99 is None:
+        return max_timeout
+    return min(max_timeout, max(ADAPTIVE_TIMEOUT_MIN, p99 * ADAPTIVE_TIMEOUT_MULTIPLIER))
+
+# Function to pick how long to wait before hedging a read of an endpoint
+def hedge_delay(endpoint):
+    p95 = get_latency(endpoint).percentile(95)
+    return HEDGE_DEFAULT_DELAY if p95 is None else max(HEDGE_MIN_DELAY, p95)
+
+# Runs callbacks after a delay on one daemon thread, so waiting to hedge
+# does not take a thread per request. Callbacks must be quick.
+class TimerQueue:
+    def __init__(self):
+        self._heap = []
+        self._order = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def call_later(self, delay, callback):
+        with self._condition:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='managerr-hedge-timer', daemon=True)
+                self._thread.start()
+            heapq.heappush(self._heap, (time.monotonic() + delay, next(self._order), callback))
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._heap or self._heap[0][0] > time.monotonic():
+                    self._condition.wait(self._heap[0][0] - time.monotonic() if self._heap else None)
+                _, _, callback = heapq.heappop(self._heap)
+            callback()
+
+# Function to get the process-wide hedge timer
+@lru_cache(maxsize=None)
+def get_hedge_timers():
+    return TimerQueue()
+
+# Function to get the pool that sends hedges (only hedges: first attempts run on the caller's thread)
+@lru_cache(maxsize=None)
+def get_hedge_executor():
+    return ThreadPoolExecutor(max_workers=32, thread_name_prefix='managerr-hedge')
+
+# Function to run `send()` on the caller's thread and, if it has not finished
+# after `delay` seconds and the `budget` (if any) allows it, send a second
+# identical call from the hedge pool. A blocking call cannot be abandoned, so
+# the first call's result is returned when it succeeds; when it fails (e.g.
+# its read deadline passes) the hedge, already under way, answers instead.
+# An exception is only raised if both calls fail. `on_discard` receives the
+# hedge's result when it is not used, whenever it arrives.
+def hedged(send, delay, on_discard=None, budget=None):
+    if budget is not None:
+        budget.deposit()
+    lock = threading.Lock()
+    state = {'finished': False, 'hedge': None}
+
+    def send_hedge():
+        with lock:
+            if not state['finished'] and (budget is None or budget.withdraw()):
+                state['hedge'] = get_hedge_executor().submit(send)
+
+    def finish():
+        with lock:
+            state['finished'] = True
+            return state['hedge']
+
+    get_hedge_timers().call_later(delay, send_hedge)
+    try:
+        result = send()
+    except Exception:
+        hedge = finish()
+        if hedge is None:
+            raise
+        try:
+            return hedge.result()
+        except Exception:
+            pass
+        raise  # Both failed: report the first call's error
+
+    hedge = finish()
+    if hedge is not None and on_discard is not None:
+        hedge.add_done_callback(lambda f: f.exception() is None and on_discard(f.result()))
+    return result
+
+# Coroutine counterpart of hedged() for the asyncio client: `send` is a
+# coroutine function. The slower call is cancelled, which releases its connection.
+async def hedged_async(send, delay, budget=None):
+    if budget is not None:
+        budget.deposit()
+    tasks = [asyncio.ensure_future(send())]
+    done, _ = await asyncio.wait(tasks, timeout=delay)
+    if not done and (budget is None or budget.withdraw()):
+        tasks.append(asyncio.ensure_future(send()))
+
+    pending = set(tasks)
+    error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+# Function to remember the last good response of a read
+def remember_snapshot(endpoint, key, value):
+    with _lock:
+        _snapshots[(endpoint, key)] = value
+        _snapshots.move_to_end((endpoint, key))
+        while len(_snapshots) > SNAPSHOT_MAX_ENTRIES:
+            _snapshots.popitem(last=False)
+
+# Function to get the last good response of a read, or None
+def last_snapshot(endpoint, key):
+    with _lock:
+        return _snapshots.get((endpoint, key))
+
+# Function to report breaker state per endpoint (for diagnostics)
+def breaker_states():
+    with _lock:
+        return {endpoint: breaker.state for endpoint, breaker in _breakers.items()}
@@ -0,0 +1,71 @@
+# modules/singleflight.py
+
+import os
+import threading
+import time
+
+# How long (seconds) a finished result is handed to callers that arrive just after it
+SINGLEFLIGHT_WINDOW = float(os.environ.get('MANAGERR_SINGLEFLIGHT_WINDOW', 0.25))
+
+
+# One shared execution of a call
+class _Call:
+    __slots__ = ('event', 'result', 'error', 'finished_at')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.finished_at = None
+
+
+# Process-wide request coalescing: concurrent calls with the same key share one
+# execution, and calls within `window` seconds after it finished reuse its result.
+class SingleFlight:
+    def __init__(self, window=SINGLEFLIGHT_WINDOW):
+        self.window = window
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None and call.finished_at is not None and time.monotonic() - call.finished_at > self.window:
+                call = None
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if leader:
+            try:
+                call.result = func(*args)
+            except BaseException as e:
+                call.error = e
+            finally:
+                call.finished_at = time.monotonic()
+                call.event.set()
+                self._sweep()
+        else:
+            call.event.wait()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    # Drop a key so the next call executes again (e.g. after a write)
+    def forget(self, key):
+        with self._lock:
+            self._calls.pop(key, None)
+
+    # Drop every finished call (benchmarks use this to force fresh fetches)
+    def clear(self):
+        with self._lock:
+            for key in [key for key, call in self._calls.items() if call.finished_at is not None]:
+                del self._calls[key]
+
+    # Drop finished calls older than the window
+    def _sweep(self):
+        cutoff = time.monotonic() - self.window
+        with self._lock:
+            for key in [key for key, call in self._calls.items() if call.finished_at is not None and call.finished_at < cutoff]:
+                del self._calls[key]
@@ -0,0 +1,89 @@
+# modules/snapshot_store.py
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Where the last device list and statuses of each account are kept between restarts
+SNAPSHOT_DB_PATH = os.environ.get('MANAGERR_SNAPSHOT_DB', os.path.join(os.path.expanduser('~'), '.managerr', 'snapshots.db'))
+
+_schema_ready = set()
+_schema_lock = threading.Lock()
+
+
+# Function to open a local SQLite store that only the current user can read.
+# A new directory is created 0700 and the database 0600; SQLite gives its
+# -wal and -shm files the database's mode. Files left by older versions are
+# tightened to 0600 as well.
+def connect_private(path, timeout):
+    if path != ':memory:':
+        os.makedirs(os.path.dirname(os.path.abspath(path)), mode=0o700, exist_ok=True)
+        os.close(os.open(path, os.O_RDWR | os.O_CREAT, 0o600))
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.chmod(path + suffix, 0o600)
+    return sqlite3.connect(path, timeout=timeout)
+
+# Function to open the snapshot database, creating it on first use
+def connect(path=None):
+    path = path or SNAPSHOT_DB_PATH
+    connection = connect_private(path, timeout=5)
+    with _schema_lock:
+        if path not in _schema_ready:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS snapshots ('
+                ' user_key TEXT NOT NULL,'
+                ' kind TEXT NOT NULL,'
+                ' payload TEXT NOT NULL,'
+                ' updated_at REAL NOT NULL,'
+                ' PRIMARY KEY (user_key, kind))'
+            )
+            connection.commit()
+            _schema_ready.add(path)
+    return connection
+
+# Function to derive the storage key of an account; the mobile number itself is not stored
+def user_key(mobile):
+    return hashlib.sha256(f'managerr:{mobile}'.encode()).hexdigest()
+
+# Function to save the latest device list ('devices') or status list ('statuses') of an account
+def save_snapshot(mobile, kind, payload, path=None):
+    connection = connect(path)
+    try:
+        with connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO snapshots (user_key, kind, payload, updated_at) VALUES (?, ?, ?, ?)',
+                (user_key(mobile), kind, json.dumps(payload, separators=(',', ':')), time.time()),
+            )
+    finally:
+        connection.close()
+
+# Function to load an account's saved snapshot.
+# Returns {'devices': [...], 'statuses': [...], 'updated_at': epoch} or None if incomplete.
+def load_snapshot(mobile, path=None):
+    connection = connect(path)
+    try:
+        rows = connection.execute(
+            'SELECT kind, payload, updated_at FROM snapshots WHERE user_key = ?', (user_key(mobile),)
+        ).fetchall()
+    finally:
+        connection.close()
+
+    snapshot = {kind: json.loads(payload) for kind, payload, _ in rows}
+    if 'devices' not in snapshot or 'statuses' not in snapshot:
+        return None
+    snapshot['updated_at'] = min(updated_at for _, _, updated_at in rows)
+    return snapshot
+
+# Function to forget an account's snapshot
+def delete_snapshot(mobile, path=None):
+    connection = connect(path)
+    try:
+        with connection:
+            connection.execute('DELETE FROM snapshots WHERE user_key = ?', (user_key(mobile),))
+    finally:
+        connection.close()
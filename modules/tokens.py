@@ -0,0 +1,175 @@
+# modules/tokens.py
+
+import asyncio
+import base64
+import json
+import os
+import threading
+import time
+
+from modules.utils import login_api_call
+
+# Renew a token this many seconds before it expires (only when credentials are kept)
+TOKEN_REFRESH_MARGIN = float(os.environ.get('MANAGERR_TOKEN_REFRESH_MARGIN', 300))
+
+# ...but never earlier than this fraction of the token's lifetime, so short-lived
+# tokens are not renewed on every request
+TOKEN_REFRESH_FRACTION = float(os.environ.get('MANAGERR_TOKEN_REFRESH_FRACTION', 0.25))
+
+# Wait this long after a failed renewal before trying again
+TOKEN_RETRY_INTERVAL = float(os.environ.get('MANAGERR_TOKEN_RETRY_INTERVAL', 30))
+
+
+# Function to read a numeric JWT claim (epoch seconds) locally, without
+# verifying the signature; None if the token has no readable such claim
+def _token_claim(jwt_token, name):
+    try:
+        claims = jwt_token.split('.')[1]
+        claims = json.loads(base64.urlsafe_b64decode(claims + '=' * (-len(claims) % 4)))
+        return float(claims[name])
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+        return None
+
+# Function to read a JWT's expiry; None if it has no readable 'exp' claim
+def token_expiry(jwt_token):
+    return _token_claim(jwt_token, 'exp')
+
+# Function to tell whether a token's 'exp' has passed (tokens without one never expire)
+def token_expired(jwt_token, now=None):
+    expires_at = token_expiry(jwt_token)
+    return expires_at is not None and expires_at <= (time.time() if now is None else now)
+
+# Function to tell whether an API helper was rejected with HTTP 401
+def is_unauthorized(response):
+    return isinstance(response, dict) and response.get('status_code') == 401
+
+
+# Holds one account's token and renews it by logging in again. The password is
+# only kept (in memory) when the user opted in; without it the manager can
+# still tell that the token expired, but not renew it. Thread-safe, so one
+# manager can serve every concurrent fetch of a session.
+class TokenManager:
+    def __init__(self, mobile, jwt_token, password=None, refresh_margin=TOKEN_REFRESH_MARGIN):
+        self.mobile = mobile
+        self.refresh_margin = refresh_margin
+        self.last_error = None
+        self._password = password
+        self._retry_at = 0.0
+        self._forced_for = None  # Token whose 401 already triggered a renewal
+        self._lock = threading.Lock()
+        self._set_token(jwt_token)
+
+    # Store a token and work out how long before its expiry to renew it: the
+    # configured margin, clamped to a fraction of the token's lifetime (from
+    # 'iat', or from now when the token does not say when it was issued)
+    def _set_token(self, jwt_token):
+        self.jwt_token = jwt_token
+        self.expires_at = token_expiry(jwt_token)
+        if self.expires_at is None:
+            self.renew_at = None
+            return
+        issued_at = _token_claim(jwt_token, 'iat') or time.time()
+        lifetime = max(0.0, self.expires_at - issued_at)
+        self.renew_at = self.expires_at - min(self.refresh_margin, lifetime * TOKEN_REFRESH_FRACTION)
+
+    @property
+    def can_renew(self):
+        return self._password is not None
+
+    def expired(self, now=None):
+        now = time.time() if now is None else now
+        return self.expires_at is not None and self.expires_at <= now
+
+    # Log in again, unless a recent renewal failed (`force` skips that wait);
+    # the caller holds the lock
+    def _renew(self, force=False):
+        if not force and time.monotonic() < self._retry_at:
+            return False
+        auth_response = login_api_call(self.mobile, self._password)
+        if 'jwt_token' not in auth_response:
+            self.last_error = auth_response.get('message', 'Login failed')
+            self._retry_at = time.monotonic() + TOKEN_RETRY_INTERVAL
+            return False
+        self._set_token(auth_response['jwt_token'])
+        self.last_error = None
+        if self.renew_at is not None and self.renew_at <= time.time():
+            # The new token is already due (clock skew, or a backend issuing
+            # tokens that are all but expired): don't log in again on every call
+            self._retry_at = time.monotonic() + TOKEN_RETRY_INTERVAL
+        return True
+
+    # Whether get() would try to log in again before answering
+    def due(self):
+        return self.can_renew and self.renew_at is not None and self.renew_at <= time.time()
+
+    # The current token, renewed first when it is close to expiring
+    def get(self):
+        with self._lock:
+            if self.due():
+                self._renew()
+            return self.jwt_token
+
+    # Token to retry with after `rejected` got a 401, or None if it cannot be renewed.
+    # Concurrent callers that hit the same 401 share a single renewal. The first
+    # 401 of a token renews at once; after that a failed renewal's backoff holds,
+    # so a wrong password does not mean one login per rejected request.
+    def refresh(self, rejected):
+        with self._lock:
+            if self.jwt_token != rejected:
+                return self.jwt_token
+            if not self.can_renew:
+                return None
+            force = self._forced_for != rejected
+            self._forced_for = rejected
+            return self.jwt_token if self._renew(force) else None
+
+    # Function to wrap an API helper that takes the token as its second argument
+    # (every helper in utils and cache does). The wrapper always sends the
+    # current token and retries once with a renewed token after a 401.
+    def wrap(self, func):
+        def call(first, jwt_token, *args):
+            jwt_token = self.get()
+            response = func(first, jwt_token, *args)
+            if is_unauthorized(response):
+                renewed = self.refresh(jwt_token)
+                if renewed is not None:
+                    response = func(first, renewed, *args)
+            return response
+        return call
+
+    # Function to wrap a coroutine API helper (async_client) the same way. Logins
+    # are blocking, so renewals run in the loop's default executor.
+    def wrap_async(self, func):
+        async def call(first, jwt_token, *args):
+            loop = asyncio.get_running_loop()
+            jwt_token = await loop.run_in_executor(None, self.get) if self.due() else self.jwt_token
+            response = await func(first, jwt_token, *args)
+            if is_unauthorized(response):
+                renewed = await loop.run_in_executor(None, self.refresh, jwt_token)
+                if renewed is not None:
+                    response = await func(first, renewed, *args)
+            return response
+        return call
+
+
+# Renewable managers of the accounts logged in on this server, so background
+# work (scheduled jobs) can send a live token instead of the one stored when
+# it was queued. Only managers that can renew are kept; in memory only.
+_renewable = {}
+_renewable_lock = threading.Lock()
+
+# Function to make an account's renewable manager available to background work
+def register_manager(manager):
+    if manager.can_renew:
+        with _renewable_lock:
+            _renewable[manager.mobile] = manager
+
+# Function to forget an account's manager (on logout)
+def unregister_manager(mobile):
+    with _renewable_lock:
+        _renewable.pop(mobile, None)
+
+# Function to get an account's renewable manager, or None
+def renewable_manager(mobile):
+    with _renewable_lock:
+        return _renewable.get(mobile)
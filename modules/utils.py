@@ -1,19 +1,157 @@
 # modules/utils.py
 
+import os
+import time
+from functools import lru_cache
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+
+from modules import metrics, resilience
+from modules.decoding import decode_response, stream_records
+from modules.fleet import Device, Status
+
+# Define constant for the root URL (point MANAGERR_API_ROOT_URL at a local mock backend for benchmarks)
+API_ROOT_URL = os.environ.get('MANAGERR_API_ROOT_URL', 'https://manage-roborakhwala.com/v1api/')
+
+# HTTP client settings (overridable through environment variables)
+API_POOL_CONNECTIONS = int(os.environ.get('MANAGERR_POOL_CONNECTIONS', 4))
+API_POOL_MAXSIZE = int(os.environ.get('MANAGERR_POOL_MAXSIZE', 32))
+API_CONNECT_TIMEOUT = float(os.environ.get('MANAGERR_CONNECT_TIMEOUT', 3.05))
+API_READ_TIMEOUT = float(os.environ.get('MANAGERR_READ_TIMEOUT', 15))
+API_READ_RETRIES = int(os.environ.get('MANAGERR_READ_RETRIES', 2))
+API_RETRY_BACKOFF = float(os.environ.get('MANAGERR_RETRY_BACKOFF', 0.3))
+
+# Status codes worth retrying for idempotent reads
+RETRY_STATUS_CODES = (502, 503, 504)
+
+# Error returned by the token-authenticated helpers when the backend rejects the token (HTTP 401)
+SESSION_EXPIRED_MESSAGE = "Session expired, please log in again"
+
+# Function to build the process-wide HTTP session with keep-alive pooling.
+# Cached so every Streamlit session and rerun in this server process shares
+# the same connection pool instead of paying a TCP+TLS handshake per call.
+@lru_cache(maxsize=None)
+def get_http_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=API_POOL_CONNECTIONS, pool_maxsize=API_POOL_MAXSIZE, max_retries=0)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    # Compressed bodies: gzip/deflate, plus br/zstd when brotli/zstandard are installed
+    session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+    return session
+
+# Function to get the endpoint name (e.g. 'get_task') from an API url
+def endpoint_name(url):
+    return url.rstrip('/').rsplit('/', 1)[-1]
+
+# Function to check an endpoint's circuit and pick the read deadline and the
+# number of attempts of a request. Shared with the asyncio client, so both
+# transports follow the same policy. Raises CircuitOpenError while the
+# endpoint's circuit is open.
+def request_policy(endpoint, idempotent):
+    breaker = resilience.get_breaker(endpoint)
+    if not breaker.allow():
+        raise resilience.CircuitOpenError(f"{endpoint} is temporarily unavailable")
+    read_timeout = resilience.adaptive_read_timeout(endpoint, API_READ_TIMEOUT) if idempotent else API_READ_TIMEOUT
+    attempts = API_READ_RETRIES + 1 if idempotent else 1
+    return breaker, read_timeout, attempts
+
+# Function to record the outcome of one attempt (status code, or 'error' if no
+# response came back) in the metrics and the endpoint's latency window
+def record_attempt(endpoint, elapsed, status):
+    if metrics.enabled:
+        metrics.record_request(endpoint, elapsed, status)
+    if status != 'error' and status < 500:
+        resilience.get_latency(endpoint).observe(elapsed)
 
-# Define constant for the root URL
-API_ROOT_URL = 'https://manage-roborakhwala.com/v1api/'
+# Function to send a POST through the shared session. Only idempotent reads
+# are retried (with exponential backoff) and hedged; commands are sent once.
+# Fails fast with CircuitOpenError while the endpoint's circuit is open.
+# With stream=True the body is left unread for the caller to stream and close.
+def api_post(url, payload, headers=None, idempotent=False, stream=False):
+    session = get_http_session()
+    endpoint = endpoint_name(url)
+    breaker, read_timeout, attempts = request_policy(endpoint, idempotent)
+    timeout = (API_CONNECT_TIMEOUT, read_timeout)
+
+    def send():
+        started_at = time.perf_counter()
+        try:
+            response = session.post(url, json=payload, headers=headers, timeout=timeout, stream=stream)
+        except (requests.ConnectionError, requests.Timeout):
+            record_attempt(endpoint, time.perf_counter() - started_at, 'error')
+            raise
+        record_attempt(endpoint, time.perf_counter() - started_at, response.status_code)
+        return response
+
+    healthy = False
+    try:
+        for attempt in range(attempts):
+            last_attempt = attempt == attempts - 1
+            try:
+                if idempotent and resilience.HEDGE_ENABLED:
+                    response = resilience.hedged(send, resilience.hedge_delay(endpoint), on_discard=lambda r: r.close(),
+                                                 budget=resilience.get_hedge_budget(endpoint))
+                else:
+                    response = send()
+            except (requests.ConnectionError, requests.Timeout):
+                if last_attempt:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or last_attempt:
+                    healthy = response.status_code < 500
+                    return response
+                response.close()
+            if metrics.enabled:
+                metrics.record_retry(endpoint)
+            time.sleep(API_RETRY_BACKOFF * (2 ** attempt))
+    finally:
+        if healthy:
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+
+# Function to build the url, payload and headers of a token-authenticated call
+def auth_request(endpoint, mobile, jwt_token, **fields):
+    url = f'{API_ROOT_URL}/{endpoint}'
+    headers = {'Authorization': f'Bearer {jwt_token}'}
+    payload = {'user_login_id': mobile, 'jwt_token': jwt_token, **fields}
+    return url, payload, headers
+
+# Function to build the error a token-authenticated helper returns for a non-200 status
+def error_result(status_code, failure_message):
+    if status_code == 401:
+        return {"success": False, "message": SESSION_EXPIRED_MESSAGE, "status_code": 401}
+    return {"success": False, "message": failure_message, "status_code": status_code}
+
+# Function to turn the status and decoded body (None unless 200) of a list
+# read into the helper's result, remembering good answers for read_fallback
+def read_result(endpoint, mobile, jwt_token, status_code, body, failure_message):
+    if status_code == 200:
+        resilience.remember_snapshot(endpoint, (mobile, jwt_token), body)
+        return body
+    return error_result(status_code, failure_message)
+
+# Function to answer a list read that could not be sent: the last known list
+# while the endpoint's circuit is open, otherwise an error
+def read_fallback(endpoint, mobile, jwt_token, error):
+    if isinstance(error, resilience.CircuitOpenError):
+        snapshot = resilience.last_snapshot(endpoint, (mobile, jwt_token))
+        if snapshot is not None:
+            return snapshot
+    return {"success": False, "message": f"API request failed: {str(error)}"}
 
 # Function to make the login API call
 def login_api_call(mobile, password):
     try:
         url = f'{API_ROOT_URL}/validate_user'
         payload = {'mobile': mobile, 'password': password}
-        response = requests.post(url, json=payload)
+        response = api_post(url, payload)
 
         if response.status_code == 200:
-            return response.json()  # Assuming the API returns a jwt_token on success
+            return decode_response(response)  # Assuming the API returns a jwt_token on success
         else:
             return {"success": False, "message": "Invalid mobile number or password"}
     except Exception as e:
@@ -23,65 +161,89 @@ def login_api_call(mobile, password):
 def user_registry(mobile, password, confirm_password):
     if password != confirm_password:
         return {"success": False, "message": "Passwords do not match"}
-    
+
     try:
         url = f'{API_ROOT_URL}/user_registry'
         payload = {'mobile': mobile, 'password': password, 'confirm_password': confirm_password}
-        response = requests.post(url, json=payload)
+        response = api_post(url, payload)
 
         if response.status_code == 200:
-            return response.json()  # Assuming the API returns a success message
+            return decode_response(response)  # Assuming the API returns a success message
         else:
             return {"success": False, "message": "Registration failed"}
     except Exception as e:
         return {"success": False, "message": f"API request failed: {str(e)}"}
 
+# Function to fetch a token-authenticated list endpoint (devices or statuses)
+def _read_list(endpoint, mobile, jwt_token, failure_message):
+    try:
+        url, payload, headers = auth_request(endpoint, mobile, jwt_token)
+        response = api_post(url, payload, headers=headers, idempotent=True)
+        body = decode_response(response) if response.status_code == 200 else None
+        return read_result(endpoint, mobile, jwt_token, response.status_code, body, failure_message)
+    except Exception as e:
+        # Serves the last known list while the backend is failing
+        return read_fallback(endpoint, mobile, jwt_token, e)
+
 # Function to fetch IoT devices (separate device listing logic)
 def get_iot_devices(mobile, jwt_token):
-    try:
-        url = f'{API_ROOT_URL}/get_user_profile_details'
-        headers = {'Authorization': f'Bearer {jwt_token}'}
-        payload = {'user_login_id': mobile, 'jwt_token': jwt_token}
-        response = requests.post(url, json=payload, headers=headers)
+    return _read_list('get_user_profile_details', mobile, jwt_token, "Failed to fetch IoT devices")
 
-        if response.status_code == 200:
-            return response.json()  # Assuming the API returns a list of devices
-        else:
-            return {"success": False, "message": "Failed to fetch IoT devices"}
+# Function to get device statuses on page load
+def get_device_status(mobile, jwt_token):
+    return _read_list('get_task', mobile, jwt_token, "Failed to fetch device statuses")
+
+# Function to fetch a token-authenticated list endpoint as a stream: records
+# are decoded as the body arrives and turned into `factory` objects, so the
+# full list of dicts is never held in memory
+def _stream_list(endpoint, mobile, jwt_token, factory, failure_message):
+    try:
+        url, payload, headers = auth_request(endpoint, mobile, jwt_token)
+        response = api_post(url, payload, headers=headers, idempotent=True, stream=True)
+        try:
+            if response.status_code == 200:
+                return stream_records(response, factory)
+            return error_result(response.status_code, failure_message)
+        finally:
+            response.close()
     except Exception as e:
         return {"success": False, "message": f"API request failed: {str(e)}"}
 
-# Function to get device statuses on page load
-def get_device_status(mobile, jwt_token):
+# Function to fetch IoT devices as compact Device objects (for large accounts)
+def stream_iot_devices(mobile, jwt_token):
+    return _stream_list('get_user_profile_details', mobile, jwt_token, Device.from_dict, "Failed to fetch IoT devices")
+
+# Function to fetch device statuses as compact Status objects (for large accounts)
+def stream_device_status(mobile, jwt_token):
+    return _stream_list('get_task', mobile, jwt_token, Status.from_dict, "Failed to fetch device statuses")
+
+# Function to poll device statuses with a conditional request.
+# Returns (statuses, etag); statuses is None when the backend answers
+# 304 Not Modified for the ETag we already hold.
+def poll_device_status(mobile, jwt_token, etag=None):
     try:
-        url = f'{API_ROOT_URL}/get_task'
-        headers = {'Authorization': f'Bearer {jwt_token}'}
-        payload = {'user_login_id': mobile, 'jwt_token': jwt_token}
-        response = requests.post(url, json=payload, headers=headers)
+        url, payload, headers = auth_request('get_task', mobile, jwt_token)
+        if etag:
+            headers['If-None-Match'] = etag
+        response = api_post(url, payload, headers=headers, idempotent=True)
 
-        if response.status_code == 200:
-            return response.json()  # Assuming the API returns a list of statuses
-        else:
-            return {"success": False, "message": "Failed to fetch device statuses"}
+        if response.status_code == 304:
+            return None, etag
+        body = decode_response(response) if response.status_code == 200 else None
+        statuses = read_result('get_task', mobile, jwt_token, response.status_code, body, "Failed to fetch device statuses")
+        return statuses, response.headers.get('ETag') if response.status_code == 200 else etag
     except Exception as e:
-        return {"success": False, "message": f"API request failed: {str(e)}"}
+        return read_fallback('get_task', mobile, jwt_token, e), etag
 
 # Function to update the task (start/stop based on duration)
 def update_task(device_id, jwt_token, mobile, duration):
     try:
-        url = f'{API_ROOT_URL}/update_task'
-        headers = {'Authorization': f'Bearer {jwt_token}'}
-        payload = {
-            'user_login_id': mobile,
-            'jwt_token': jwt_token,
-            'id': device_id,
-            'duration': duration  # Duration > 0 = start, duration = 0 = stop
-        }
-        response = requests.post(url, json=payload, headers=headers)
+        # Duration > 0 = start, duration = 0 = stop
+        url, payload, headers = auth_request('update_task', mobile, jwt_token, id=device_id, duration=duration)
+        response = api_post(url, payload, headers=headers)
 
         if response.status_code == 200:
-            return response.json()  # Return the response containing the message
-        else:
-            return {"message": "Failed to execute device command"}
+            return decode_response(response)  # Return the response containing the message
+        return error_result(response.status_code, "Failed to execute device command")
     except Exception as e:
-        return {"message": f"API request failed: {str(e)}"}
+        return {"success": False, "message": f"API request failed: {str(e)}"}
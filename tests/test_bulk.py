@@ -0,0 +1,102 @@
+import time
+
+import pytest
+
+from modules import async_client
+from modules.bulk import RateLimiter, bulk_update
+from modules.utils import update_task
+
+
+# Fake update_task: devices whose id starts with 'bad' fail, 'gone' ones get a 401, and
+# 'boom' ones raise; every call is recorded in `calls`
+def fake_response(device_id, calls):
+    calls.append(device_id)
+    if device_id.startswith('bad'):
+        return {"success": False, "message": f"{device_id} refused", "status_code": 500}
+    if device_id.startswith('gone'):
+        return {"success": False, "message": "Session expired", "status_code": 401}
+    if device_id.startswith('boom'):
+        raise ConnectionError('reset')
+    return {"success": True, "message": f"{device_id} done"}
+
+
+@pytest.fixture
+def fake_update(monkeypatch):
+    calls = []
+
+    def update(device_id, jwt_token, mobile, duration):
+        return fake_response(device_id, calls)
+
+    async def update_async(device_id, jwt_token, mobile, duration):
+        try:
+            return fake_response(device_id, calls)
+        except ConnectionError as e:
+            return {"success": False, "message": f"API request failed: {str(e)}"}
+
+    monkeypatch.setattr(async_client, 'update_task', update_async)
+    update.calls = calls
+    return update
+
+
+def test_rate_limiter_allows_a_burst_then_throttles():
+    limiter = RateLimiter(rate=10, burst=3)
+    waits = [limiter.reserve() for _ in range(5)]
+
+    assert waits[:3] == [0.0, 0.0, 0.0]
+    assert waits[3] == pytest.approx(0.1, abs=0.01)
+    assert waits[4] == pytest.approx(0.2, abs=0.01)
+
+
+def test_rate_limiter_refills_over_time():
+    limiter = RateLimiter(rate=100, burst=1)
+    assert limiter.reserve() == 0.0
+    time.sleep(0.02)
+    assert limiter.reserve() == 0.0
+
+
+def test_zero_rate_disables_the_limit():
+    limiter = RateLimiter(rate=0)
+    assert all(limiter.reserve() == 0.0 for _ in range(100))
+
+
+def test_threads_backend_drops_duplicates_and_splits_the_report(fake_update):
+    progress = []
+    report = bulk_update(['a', 'bad-1', 'a', 'gone-1', 'boom-1', 'b', 'b'], 't', 'm1', 30, rate_limit=0,
+                         update_func=fake_update, backend='threads',
+                         on_progress=lambda done, total, device_id, response: progress.append((done, total)))
+
+    assert sorted(fake_update.calls) == ['a', 'b', 'bad-1', 'boom-1', 'gone-1']
+    assert report.total == 5 and report.action == 'start' and not report.ok
+    assert sorted(report.succeeded) == ['a', 'b']
+    assert report.failed == {'bad-1': 'bad-1 refused', 'gone-1': 'Session expired',
+                             'boom-1': 'API request failed: reset'}
+    assert report.status_codes == {'bad-1': 500, 'gone-1': 401}
+    assert [done for done, _ in progress] == [1, 2, 3, 4, 5] and {total for _, total in progress} == {5}
+
+
+def test_async_backend_drops_duplicates_and_splits_the_report(fake_update):
+    progress = []
+    report = bulk_update(['a', 'bad-1', 'a', 'gone-1', 'boom-1', 'b', 'b'], 't', 'm1', 0, rate_limit=0,
+                         update_func=update_task, backend='async',
+                         on_progress=lambda done, total, device_id, response: progress.append(device_id))
+
+    assert sorted(fake_update.calls) == ['a', 'b', 'bad-1', 'boom-1', 'gone-1']
+    assert report.action == 'stop'
+    assert sorted(report.succeeded) == ['a', 'b']
+    assert report.failed == {'bad-1': 'bad-1 refused', 'gone-1': 'Session expired',
+                             'boom-1': 'API request failed: reset'}
+    assert report.status_codes == {'bad-1': 500, 'gone-1': 401}
+    assert sorted(progress) == ['a', 'b', 'bad-1', 'boom-1', 'gone-1']
+
+
+def test_custom_update_func_uses_threads_on_the_async_backend(fake_update):
+    report = bulk_update(['a', 'b'], 't', 'm1', 30, rate_limit=0, update_func=fake_update, backend='async')
+
+    assert sorted(fake_update.calls) == ['a', 'b']
+    assert report.ok and report.to_dict()['succeeded'] == ['a', 'b']
+
+
+def test_empty_bulk_sends_nothing(fake_update):
+    report = bulk_update([], 't', 'm1', 30, update_func=fake_update)
+
+    assert fake_update.calls == [] and report.ok and report.total == 0
@@ -0,0 +1,106 @@
+import io
+import json
+
+import pytest
+
+from modules import cli
+from modules.bulk import BulkReport
+
+
+# Function to replace bulk_update with one that fails the listed devices and records its calls
+def fake_bulk(monkeypatch, failing=()):
+    calls = []
+
+    def bulk_update(device_ids, jwt_token, mobile, duration, **kwargs):
+        calls.append((list(device_ids), jwt_token, mobile, duration))
+        report = BulkReport(duration, len(device_ids))
+        for device_id in device_ids:
+            if device_id in failing:
+                report.failed[device_id] = 'Device offline'
+            else:
+                report.succeeded[device_id] = {'message': 'ok'}
+        return report
+
+    monkeypatch.setattr(cli, 'bulk_update', bulk_update)
+    return calls
+
+
+@pytest.fixture(autouse=True)
+def no_credentials_from_env(monkeypatch):
+    for name in ('MANAGERR_MOBILE', 'MANAGERR_TOKEN', 'MANAGERR_PASSWORD'):
+        monkeypatch.delenv(name, raising=False)
+
+
+def test_read_device_ids_skips_header_comments_and_blank_lines():
+    lines = io.StringIO('id,label,status\n'
+                        'dev-1,Pump,STOPPED\n'
+                        '\n'
+                        '# spare units\n'
+                        '  dev-2  \n'
+                        'dev-3,"Gate, north",STARTED\n')
+    assert cli.read_device_ids(lines) == ['dev-1', 'dev-2', 'dev-3']
+
+
+@pytest.mark.parametrize('failing, exit_code', [
+    ((), cli.EXIT_OK),
+    (('b',), cli.EXIT_PARTIAL),
+    (('a', 'b'), cli.EXIT_FAILED),
+])
+def test_bulk_exit_codes(monkeypatch, capsys, failing, exit_code):
+    calls = fake_bulk(monkeypatch, failing)
+
+    assert cli.main(['stop', 'a', 'b', '--mobile', 'm1', '--token', 't', '--quiet']) == exit_code
+    assert calls == [(['a', 'b'], 't', 'm1', 0)]
+    assert json.loads(capsys.readouterr().out)['failed'] == {device_id: 'Device offline' for device_id in failing}
+
+
+def test_bulk_reads_ids_from_stdin(monkeypatch):
+    calls = fake_bulk(monkeypatch)
+    monkeypatch.setattr('sys.stdin', io.StringIO('id,label,status\ndev-1,Pump,STOPPED\ndev-2,Gate,STOPPED\n'))
+
+    assert cli.main(['start', '--duration', '30', '--mobile', 'm1', '--token', 't', '--quiet']) == cli.EXIT_OK
+    assert calls == [(['dev-1', 'dev-2'], 't', 'm1', 30)]
+
+
+def test_bulk_logs_in_with_the_password_from_the_environment(monkeypatch):
+    calls = fake_bulk(monkeypatch)
+    monkeypatch.setenv('MANAGERR_PASSWORD', 'secret')
+    monkeypatch.setattr(cli, 'login_api_call', lambda mobile, password: {'jwt_token': f'{mobile}:{password}'})
+
+    assert cli.main(['stop', 'a', '--mobile', 'm1', '--quiet']) == cli.EXIT_OK
+    assert calls == [(['a'], 'm1:secret', 'm1', 0)]
+
+
+def test_failed_login_exits_1(monkeypatch, capsys):
+    calls = fake_bulk(monkeypatch)
+    monkeypatch.setenv('MANAGERR_PASSWORD', 'wrong')
+    monkeypatch.setattr(cli, 'login_api_call', lambda mobile, password: {'success': False, 'message': 'Invalid password'})
+
+    assert cli.main(['stop', 'a', '--mobile', 'm1']) == cli.EXIT_FAILED
+    assert calls == []
+    assert 'Invalid password' in capsys.readouterr().err
+
+
+def test_no_device_ids_exits_1(monkeypatch, capsys):
+    calls = fake_bulk(monkeypatch)
+    monkeypatch.setattr('sys.stdin', io.StringIO('# nothing to do\n\n'))
+
+    assert cli.main(['stop', '--mobile', 'm1', '--token', 't']) == cli.EXIT_FAILED
+    assert calls == []
+    assert 'No device ids' in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('duration', ['0', '-5'])
+def test_start_rejects_a_non_positive_duration(monkeypatch, capsys, duration):
+    calls = fake_bulk(monkeypatch)
+
+    assert cli.main(['start', 'a', '--duration', duration, '--mobile', 'm1', '--token', 't']) == cli.EXIT_FAILED
+    assert calls == []
+    assert '--duration must be positive' in capsys.readouterr().err
+
+
+def test_start_requires_a_duration(monkeypatch):
+    fake_bulk(monkeypatch)
+    with pytest.raises(SystemExit) as exit_info:
+        cli.main(['start', 'a', '--mobile', 'm1', '--token', 't'])
+    assert exit_info.value.code == 2
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from modules.decoding import iter_json_array, stream_records
+
+DOCUMENT = json.dumps([{'id': 'dev-1', 'action': 'STARTED'}, 12, -2.5e3, 'x, ]', None, [1, [2]], True]).encode()
+
+
+# Function to split bytes into chunks of `size`
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 7, 64, len(DOCUMENT)])
+def test_any_chunking_gives_the_same_elements(size):
+    assert list(iter_json_array(chunked(DOCUMENT, size))) == json.loads(DOCUMENT)
+
+
+def test_multibyte_characters_split_across_chunks():
+    data = json.dumps(['Gerät', '設備'], ensure_ascii=False).encode()
+    assert list(iter_json_array(chunked(data, 1))) == ['Gerät', '設備']
+
+
+@pytest.mark.parametrize('text', ['[]', ' [ ] ', '[1]', '\n[1 , 2]\n'])
+def test_well_formed_arrays(text):
+    assert list(iter_json_array(chunked(text.encode(), 1))) == json.loads(text)
+
+
+@pytest.mark.parametrize('text', [
+    '',  # Empty body
+    '{"a": 1}',  # Not an array
+    '[1, 2',  # Truncated
+    '[1,',
+    '[12',
+    '[1,,2]',  # Missing value
+    '[,1]',
+    '[1,]',
+    '[1 2]',  # Missing comma
+    '[1] 2',  # Trailing data
+    '[1]]',
+    '[] []',
+    '[tru]',  # Invalid value
+])
+@pytest.mark.parametrize('size', [1, 64])
+def test_malformed_arrays_are_rejected(text, size):
+    with pytest.raises(ValueError):
+        list(iter_json_array(chunked(text.encode(), size)))
+
+
+def test_stream_records_builds_each_element():
+    class Response:
+        def iter_content(self, chunk_size):
+            return iter(chunked(b'[{"id": "a"}, {"id": "b"}]', 5))
+
+    assert stream_records(Response(), lambda record: record['id']) == ['a', 'b']
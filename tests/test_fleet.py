@@ -0,0 +1,73 @@
+from modules.fleet import UNKNOWN_STATUS, Fleet
+
+
+# Function to build a single-account fleet from {device_id: action}; None leaves a device without status
+def make_fleet(actions, labels=None):
+    labels = labels or {}
+    return Fleet.from_responses(
+        [{'id': device_id, 'device_label': labels.get(device_id)} for device_id in actions],
+        [{'id': device_id, 'action': action} for device_id, action in actions.items() if action is not None],
+    )
+
+
+def test_diff_reports_added_removed_and_changed_devices():
+    previous = make_fleet({'a': 'STARTED', 'b': 'STOPPED', 'c': 'STOPPED'})
+    current = make_fleet({'a': 'STARTED', 'b': 'STARTED', 'd': 'STOPPED'})
+
+    assert current.diff(previous) == {
+        'b': ('STOPPED', 'STARTED'),
+        'c': ('STOPPED', None),
+        'd': (None, 'STOPPED'),
+    }
+
+
+def test_diff_without_previous_reports_every_device_as_added():
+    assert make_fleet({'a': 'STARTED', 'b': None}).diff(None) == {'a': (None, 'STARTED'), 'b': (None, UNKNOWN_STATUS)}
+
+
+def test_filter_by_query_status_and_account():
+    fleet = make_fleet({'pump-1': 'STARTED', 'gate-1': 'STOPPED', 'pump-2': 'STOPPED'}, labels={'gate-1': 'North Pump'})
+
+    assert [device.id for device in fleet.filter('PUMP')] == ['pump-1', 'gate-1', 'pump-2']
+    assert [device.id for device in fleet.filter('pump', status='STOPPED')] == ['gate-1', 'pump-2']
+    assert fleet.filter(status='UNKNOWN') == []
+    assert fleet.filter(account='other') == []
+
+
+def test_with_overrides_leaves_the_original_fleet_unchanged():
+    fleet = make_fleet({'a': 'STOPPED', 'b': 'STOPPED'})
+
+    overridden = fleet.with_overrides({'a': 'STARTING'})
+
+    assert overridden.status_of('a') == 'STARTING' and overridden.status_of('b') == 'STOPPED'
+    assert fleet.status_of('a') == 'STOPPED'
+    assert overridden.devices is fleet.devices
+    assert fleet.with_overrides({}) is fleet
+
+
+def test_merged_fleet_keys_devices_by_account():
+    fleet = Fleet.merge({
+        '1111': ([{'id': 'dev-1', 'device_label': 'Pump'}], [{'id': 'dev-1', 'action': 'STARTED'}]),
+        '2222': ([{'id': 'dev-1'}, {'id': 'dev-2'}], [{'id': 'dev-1', 'action': 'STOPPED'}]),
+    })
+
+    assert len(fleet) == 3
+    assert ('1111', 'dev-1') in fleet and 'dev-1' not in fleet
+    assert fleet.status_of(('1111', 'dev-1')) == 'STARTED'
+    assert fleet.status_of(('2222', 'dev-1')) == 'STOPPED'
+    assert fleet.status_of(('2222', 'dev-2')) == UNKNOWN_STATUS
+    assert [device.key for device in fleet.filter(account='2222')] == [('2222', 'dev-1'), ('2222', 'dev-2')]
+    assert [device.key for device in fleet.filter('222')] == [('2222', 'dev-1'), ('2222', 'dev-2')]
+    assert fleet.count_by_status() == {'STARTED': 1, 'STOPPED': 1, UNKNOWN_STATUS: 1}
+
+
+def test_merged_fleet_diff_and_overrides_use_account_keys():
+    previous = Fleet.merge({'1111': ([{'id': 'dev-1'}], [{'id': 'dev-1', 'action': 'STOPPED'}]),
+                            '2222': ([{'id': 'dev-1'}], [{'id': 'dev-1', 'action': 'STOPPED'}])})
+    current = Fleet.merge({'1111': ([{'id': 'dev-1'}], [{'id': 'dev-1', 'action': 'STARTED'}]),
+                           '2222': ([{'id': 'dev-1'}], [{'id': 'dev-1', 'action': 'STOPPED'}])})
+
+    assert current.diff(previous) == {('1111', 'dev-1'): ('STOPPED', 'STARTED')}
+    overridden = current.with_overrides({('2222', 'dev-1'): 'STARTING'})
+    assert overridden.status_of(('2222', 'dev-1')) == 'STARTING'
+    assert overridden.status_of(('1111', 'dev-1')) == 'STARTED'
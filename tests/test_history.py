@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from modules.history import StatusHistory
+
+HOUR = 3600.0
+
+
+# Function to build a get_task response from {device_id: action}
+def statuses(**actions):
+    return [{'id': device_id, 'action': action} for device_id, action in actions.items()]
+
+
+def test_only_changes_are_stored():
+    history = StatusHistory()
+    assert history.record('m1', statuses(a='STARTED', b='STOPPED'), timestamp=0) == 2
+    assert history.record('m1', statuses(a='STARTED', b='STOPPED'), timestamp=10) == 0
+    assert history.record('m1', statuses(a='STOPPED', b='STOPPED'), timestamp=20) == 1
+    assert history.size == 3
+
+
+def test_stats_uptime_starts_and_run_length():
+    history = StatusHistory()
+    history.record('m1', statuses(a='STOPPED', b='STARTED'), timestamp=0)
+    history.record('m1', statuses(a='STARTED', b='STARTED'), timestamp=HOUR)
+    history.record('m1', statuses(a='STOPPED', b='STARTED'), timestamp=2 * HOUR)
+    history.record('m1', statuses(a='STARTED', b='STARTED'), timestamp=3 * HOUR)
+
+    stats = history.stats('m1', 0, 4 * HOUR)
+
+    assert stats['device_id'] == ['a', 'b']
+    np.testing.assert_allclose(stats['uptime_pct'], [50.0, 100.0])
+    assert stats['starts'].tolist() == [2, 0]  # b was already running when first seen
+    np.testing.assert_allclose(stats['mean_run_seconds'], [HOUR, 4 * HOUR])
+
+
+def test_stats_ignore_time_before_first_observation_and_other_accounts():
+    history = StatusHistory()
+    history.record('m1', statuses(a='STARTED'), timestamp=2 * HOUR)
+    history.record('m2', statuses(a='STOPPED'), timestamp=0)
+
+    stats = history.stats('m1', 0, 4 * HOUR)
+
+    assert stats['device_id'] == ['a']
+    np.testing.assert_allclose(stats['uptime_pct'], [100.0])
+    assert history.stats('unknown', 0, HOUR)['device_id'] == []
+
+
+def test_compact_keeps_state_at_cutoff():
+    history = StatusHistory(retention=10 * HOUR)
+    history.record('m1', statuses(a='STARTED', b='STOPPED'), timestamp=0)
+    history.record('m1', statuses(a='STOPPED', b='STOPPED'), timestamp=HOUR)
+    history.record('m1', statuses(a='STOPPED', b='STARTED'), timestamp=11 * HOUR)
+
+    history.compact(now=12 * HOUR)
+
+    # a's last old event and b's baseline are kept, moved up to the cutoff
+    assert history.size == 3
+    assert history.times[:history.size].min() == pytest.approx(2 * HOUR)
+    stats = history.stats('m1', 2 * HOUR, 12 * HOUR)
+    np.testing.assert_allclose(stats['uptime_pct'], [0.0, 10.0])
+    assert stats['starts'].tolist() == [0, 1]
+
+
+def test_compact_halves_store_over_the_cap():
+    history = StatusHistory(max_events=8, compact_interval=float('inf'))
+    for step in range(10):
+        history.record('m1', statuses(a='STARTED' if step % 2 else 'STOPPED'), timestamp=step)
+
+    assert history.size <= 8
+    assert history.stats('m1', 0, 10)['device_id'] == ['a']
+
+
+def test_record_applies_retention_on_a_timer():
+    history = StatusHistory(retention=HOUR, compact_interval=60)
+    history.record('m1', statuses(a='STARTED'), timestamp=0)
+    history.record('m1', statuses(a='STOPPED'), timestamp=10)
+    history.record('m1', statuses(a='STARTED'), timestamp=20)
+    assert history.size == 3
+
+    # Nothing changed, but the interval has passed: the old events collapse to a baseline
+    assert history.record('m1', statuses(a='STARTED'), timestamp=2 * HOUR) == 0
+    assert history.size == 1
+    assert history.times[0] == pytest.approx(HOUR)
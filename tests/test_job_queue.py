@@ -0,0 +1,162 @@
+import base64
+import json
+import time
+
+import pytest
+
+from modules import job_queue
+from modules.bulk import BulkReport
+from modules.tokens import register_manager, unregister_manager, TokenManager
+
+
+# Function to build an unsigned JWT that expires at `exp`
+def make_token(exp):
+    claims = base64.urlsafe_b64encode(json.dumps({'exp': exp}).encode()).rstrip(b'=').decode()
+    return f'e30.{claims}.sig'
+
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / 'jobs.db')
+
+
+# Function to read every job's (device_id, status, jwt_token, last_error), oldest first
+def job_rows(db):
+    connection = job_queue.connect(db)
+    try:
+        return [tuple(row) for row in connection.execute('SELECT device_id, status, jwt_token, last_error FROM jobs ORDER BY id')]
+    finally:
+        connection.close()
+
+
+def test_claim_runs_latest_job_per_device(db):
+    now = time.time()
+    job_queue.enqueue_jobs('m1', 't', ['a', 'b'], 30, now - 20, path=db)
+    job_queue.enqueue_jobs('m1', 't', ['a'], 0, now - 10, path=db)
+    job_queue.enqueue_jobs('m2', 't', ['a'], 15, now - 30, path=db)
+
+    claimed = job_queue.claim_due_jobs(path=db)
+
+    assert sorted((job['mobile'], job['device_id'], job['duration']) for job in claimed) == [
+        ('m1', 'a', 0), ('m1', 'b', 30), ('m2', 'a', 15)]
+    assert all(job['attempts'] == 1 for job in claimed)
+    assert [status for _, status, _, _ in job_rows(db)] == ['superseded', 'running', 'running', 'running']
+
+
+def test_claim_ignores_future_jobs(db):
+    job_queue.enqueue_jobs('m1', 't', ['a'], 30, time.time() - 5, path=db)
+    job_queue.enqueue_jobs('m1', 't', ['a'], 0, time.time() + 3600, path=db)
+
+    claimed = job_queue.claim_due_jobs(path=db)
+
+    assert [job['duration'] for job in claimed] == [30]
+    assert [status for _, status, _, _ in job_rows(db)] == ['running', 'pending']
+
+
+def test_same_run_time_supersedes_pending_job(db):
+    run_at = time.time() + 60
+    job_queue.enqueue_jobs('m1', 't', ['a'], 30, run_at, path=db)
+    job_queue.enqueue_jobs('m1', 't', ['a'], 0, run_at, path=db)
+
+    assert job_rows(db) == [('a', 'superseded', '', None), ('a', 'pending', 't', None)]
+
+
+def test_refuses_to_schedule_past_token_expiry(db):
+    token = make_token(time.time() + 60)
+    with pytest.raises(ValueError):
+        job_queue.enqueue_jobs('m1', token, ['a'], 30, time.time() + 3600, path=db)
+    assert job_queue.enqueue_jobs('m1', token, ['a'], 30, time.time() + 30, path=db) == 1
+
+
+def test_renewable_login_allows_scheduling_past_expiry(db):
+    token = make_token(time.time() + 60)
+    register_manager(TokenManager('m1', token, 'secret'))
+    try:
+        assert job_queue.enqueue_jobs('m1', token, ['a'], 30, time.time() + 3600, path=db) == 1
+    finally:
+        unregister_manager('m1')
+
+
+def test_unauthorized_is_terminal(db, monkeypatch):
+    def fake_bulk_update(device_ids, jwt_token, mobile, duration, **kwargs):
+        report = BulkReport(duration, len(device_ids))
+        report.failed = {'a': 'Session expired', 'b': 'Server error'}
+        report.status_codes = {'a': 401, 'b': 500}
+        return report
+
+    monkeypatch.setattr(job_queue, 'bulk_update', fake_bulk_update)
+    job_queue.enqueue_jobs('m1', 't', ['a', 'b'], 30, time.time() - 1, path=db)
+
+    assert job_queue.run_due_jobs(path=db) == 2
+    assert job_rows(db) == [('a', 'failed', '', job_queue.JOB_LOGIN_EXPIRED_MESSAGE), ('b', 'pending', 't', 'Server error')]
+
+
+def test_expired_token_fails_without_calling_backend(db, monkeypatch):
+    calls = []
+    monkeypatch.setattr(job_queue, 'bulk_update', lambda *args, **kwargs: calls.append(args))
+    token = make_token(time.time() + 60)
+    job_queue.enqueue_jobs('m1', token, ['a'], 30, time.time() - 1, path=db)
+    monkeypatch.setattr(job_queue, 'token_expired', lambda jwt_token: True)
+
+    job_queue.run_due_jobs(path=db)
+
+    assert not calls
+    assert job_rows(db) == [('a', 'failed', '', job_queue.JOB_LOGIN_EXPIRED_MESSAGE)]
+
+
+def test_failures_retry_until_max_attempts(db, monkeypatch):
+    monkeypatch.setattr(job_queue, 'JOB_RETRY_BACKOFF', 0)
+    job_queue.enqueue_jobs('m1', 't', ['a'], 30, time.time() - 1, path=db)
+    for _ in range(job_queue.JOB_MAX_ATTEMPTS):
+        job, = job_queue.claim_due_jobs(path=db)
+        job_queue.complete_jobs([], [(job, 'Server error', False)], path=db)
+
+    assert job_rows(db) == [('a', 'failed', '', 'Server error')]
+
+
+def test_bulk_error_requeues_claimed_jobs(db, monkeypatch):
+    def broken_bulk_update(*args, **kwargs):
+        raise RuntimeError("async backend unavailable")
+
+    monkeypatch.setattr(job_queue, 'bulk_update', broken_bulk_update)
+    job_queue.enqueue_jobs('m1', 't', ['a'], 30, time.time() - 1, path=db)
+
+    assert job_queue.run_due_jobs(path=db) == 1
+    assert job_rows(db) == [('a', 'pending', 't', 'Worker error: async backend unavailable')]
+
+
+def test_worker_survives_errors(db, monkeypatch):
+    calls = []
+
+    def failing_run(path):
+        calls.append(path)
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(job_queue, 'run_due_jobs', failing_run)
+    worker = job_queue.JobWorker(path=db, poll_interval=0.01)
+    worker.start()
+    time.sleep(0.2)
+    worker.stop()
+    worker.join(1)
+
+    assert len(calls) > 1
+
+
+def test_recovery_only_takes_expired_leases(db):
+    job_queue.enqueue_jobs('m1', 't', ['a', 'b'], 30, time.time() - 1, path=db)
+    job_queue.claim_due_jobs(path=db)
+    connection = job_queue.connect(db)
+    with connection:
+        connection.execute("UPDATE jobs SET updated_at = ? WHERE device_id = 'a'", (time.time() - 120,))
+    connection.close()
+
+    assert job_queue.recover_running_jobs(lease=60, path=db) == 1
+    assert [status for _, status, _, _ in job_rows(db)] == ['pending', 'running']
+
+
+def test_database_is_private(tmp_path):
+    path = tmp_path / 'store' / 'jobs.db'
+    job_queue.connect(str(path)).close()
+
+    assert path.parent.stat().st_mode & 0o777 == 0o700
+    assert path.stat().st_mode & 0o777 == 0o600
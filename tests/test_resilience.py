@@ -0,0 +1,177 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from modules import resilience
+from modules.resilience import CircuitBreaker, HedgeBudget, hedged, hedged_async
+
+
+def test_breaker_opens_after_threshold_and_probes_once():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0.05)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == 'closed' and breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.state == 'half-open'
+    assert breaker.allow()  # The probe
+    assert not breaker.allow()  # Only one at a time
+
+
+def test_failed_probe_reopens_and_successful_probe_closes():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed' and breaker.failures == 0
+
+
+def test_hedge_budget_caps_hedges_at_a_fraction():
+    budget = HedgeBudget(ratio=0.1, burst=1)
+    assert budget.withdraw()
+    assert not budget.withdraw()
+    for _ in range(10):
+        budget.deposit()
+    assert budget.withdraw()
+    assert not budget.withdraw()
+
+
+# A send() whose successive calls take the given durations and return their call number
+class Sender:
+    def __init__(self, *durations):
+        self.durations = list(durations)
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            number = self.calls
+            self.calls += 1
+        time.sleep(self.durations[number])
+        return number
+
+
+def test_fast_call_is_not_hedged():
+    send = Sender(0.0, 0.0)
+    assert hedged(send, delay=0.5) == 0
+    assert send.calls == 1
+
+
+def test_first_call_runs_on_the_callers_thread():
+    threads = []
+
+    def send():
+        threads.append(threading.current_thread())
+        return len(threads)
+
+    assert hedged(send, delay=0.5) == 1
+    assert threads == [threading.current_thread()]
+
+
+def test_slow_call_is_hedged_and_unused_hedge_discarded():
+    send, discarded = Sender(0.3, 0.0), []
+    assert hedged(send, delay=0.05, on_discard=discarded.append) == 0
+    assert send.calls == 2
+    time.sleep(0.05)
+    assert discarded == [1]
+
+
+def test_hedge_answers_when_the_first_call_fails():
+    calls = []
+
+    def send():
+        calls.append(None)
+        if len(calls) == 1:
+            time.sleep(0.2)
+            raise TimeoutError('read timed out')
+        return 'hedge'
+
+    started_at = time.monotonic()
+    assert hedged(send, delay=0.05) == 'hedge'
+    assert time.monotonic() - started_at < 0.3  # No retry from scratch
+
+
+def test_loser_finishing_with_the_winner_is_discarded():
+    # Both calls are already done when hedged() looks at them
+    barrier = threading.Barrier(2)
+    calls = []
+
+    def send():
+        calls.append(None)
+        number = len(calls) - 1
+        if number == 1:
+            barrier.wait()
+        else:
+            time.sleep(0.05)
+            barrier.wait()
+        return number
+
+    discarded = []
+    winner = hedged(send, delay=0.01, on_discard=discarded.append)
+    time.sleep(0.05)
+    assert sorted([winner] + discarded) == [0, 1]
+
+
+def test_exhausted_budget_skips_the_hedge():
+    budget = HedgeBudget(ratio=0.0, burst=0)
+    send = Sender(0.1, 0.0)
+    assert hedged(send, delay=0.01, budget=budget) == 0
+    assert send.calls == 1
+
+
+def test_hedged_raises_only_when_both_calls_fail():
+    calls = []
+
+    def send():
+        calls.append(None)
+        time.sleep(0.1)  # Still running when the hedge is sent
+        raise ConnectionError('down')
+
+    with pytest.raises(ConnectionError):
+        hedged(send, delay=0.01)
+    assert len(calls) == 2
+
+
+def test_hedged_async_cancels_the_slower_call():
+    cancelled = []
+
+    async def main():
+        calls = []
+
+        async def send():
+            calls.append(None)
+            number = len(calls) - 1
+            try:
+                await asyncio.sleep(0.3 if number == 0 else 0.0)
+            except asyncio.CancelledError:
+                cancelled.append(number)
+                raise
+            return number
+
+        result = await hedged_async(send, delay=0.05)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(main()) == 1
+    assert cancelled == [0]
+
+
+def test_snapshots_are_bounded(monkeypatch):
+    monkeypatch.setattr(resilience, 'SNAPSHOT_MAX_ENTRIES', 2)
+    monkeypatch.setattr(resilience, '_snapshots', type(resilience._snapshots)())
+    for key in range(3):
+        resilience.remember_snapshot('get_task', key, [key])
+    assert resilience.last_snapshot('get_task', 0) is None
+    assert resilience.last_snapshot('get_task', 2) == [2]
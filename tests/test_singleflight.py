@@ -0,0 +1,100 @@
+import threading
+import time
+
+import pytest
+
+from modules.singleflight import SingleFlight
+
+
+# A slow call that counts how often it really runs
+class Counter:
+    def __init__(self, duration=0.1):
+        self.duration = duration
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, value):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.duration)
+        return value
+
+
+# Function to call `flight.do(key, func, value)` from `count` threads at once; returns their results
+def call_concurrently(flight, key, func, value, count=8):
+    results = [None] * count
+    barrier = threading.Barrier(count)
+
+    def run(index):
+        barrier.wait()
+        results[index] = flight.do(key, func, value)
+
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_calls_share_one_execution():
+    flight, func = SingleFlight(window=0), Counter()
+    assert call_concurrently(flight, 'key', func, 42) == [42] * 8
+    assert func.calls == 1
+
+
+def test_different_keys_run_separately():
+    flight, func = SingleFlight(window=0), Counter(0.0)
+    flight.do('a', func, 1)
+    flight.do('b', func, 2)
+    assert func.calls == 2
+
+
+def test_result_is_reused_within_the_window_only():
+    flight, func = SingleFlight(window=0.05), Counter(0.0)
+    flight.do('key', func, 1)
+    assert flight.do('key', func, 2) == 1
+    time.sleep(0.06)
+    assert flight.do('key', func, 3) == 3
+    assert func.calls == 2
+
+
+def test_forget_forces_a_new_execution():
+    flight, func = SingleFlight(window=10), Counter(0.0)
+    flight.do('key', func, 1)
+    flight.forget('key')
+    assert flight.do('key', func, 2) == 2
+    flight.clear()
+    assert flight.do('key', func, 3) == 3
+
+
+def test_error_is_raised_to_every_waiter_and_not_kept():
+    flight = SingleFlight(window=0)
+    calls = []
+
+    def fail(value):
+        calls.append(value)
+        time.sleep(0.1)
+        raise ConnectionError('down')
+
+    errors = []
+    barrier = threading.Barrier(4)
+
+    def run():
+        barrier.wait()
+        try:
+            flight.do('key', fail, 1)
+        except ConnectionError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(errors) == 4 and len(calls) == 1
+
+    time.sleep(0.01)
+    with pytest.raises(ConnectionError):
+        flight.do('key', fail, 2)
+    assert calls == [1, 2]
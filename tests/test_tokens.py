@@ -0,0 +1,172 @@
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import base64
+import json
+import threading
+import time
+
+from modules import tokens
+from modules.tokens import TokenManager
+
+
+# Function to build an unsigned JWT with the given claims
+def make_token(**claims):
+    payload = base64.urlsafe_b64encode(json.dumps(claims).encode()).rstrip(b'=').decode()
+    return f'e30.{payload}.sig'
+
+
+# Function to replace the login call with one that hands out tokens living `lifetime` seconds
+def fake_login(monkeypatch, lifetime, calls):
+    def login_api_call(mobile, password):
+        calls.append(mobile)
+        now = time.time()
+        return {'jwt_token': make_token(iat=now, exp=now + lifetime, n=len(calls))}
+    monkeypatch.setattr(tokens, 'login_api_call', login_api_call)
+
+
+def test_short_lived_token_is_not_renewed_on_every_get(monkeypatch):
+    calls = []
+    fake_login(monkeypatch, 120, calls)
+    now = time.time()
+    manager = TokenManager('m1', make_token(iat=now, exp=now + 120), 'secret', refresh_margin=300)
+
+    for _ in range(10):
+        manager.get()
+
+    assert calls == []
+    assert manager.renew_at == now + 120 - 120 * tokens.TOKEN_REFRESH_FRACTION
+
+
+def test_token_is_renewed_inside_margin(monkeypatch):
+    calls = []
+    fake_login(monkeypatch, 3600, calls)
+    now = time.time()
+    old_token = make_token(iat=now - 3500, exp=now + 100)
+    manager = TokenManager('m1', old_token, 'secret', refresh_margin=300)
+
+    assert manager.get() != old_token
+    manager.get()
+    assert calls == ['m1']
+
+
+def test_renewal_that_stays_due_is_rate_limited(monkeypatch):
+    calls = []
+    fake_login(monkeypatch, 1, calls)
+    now = time.time()
+    manager = TokenManager('m1', make_token(iat=now - 100, exp=now), 'secret')
+
+    for _ in range(10):
+        manager.get()
+
+    assert calls == ['m1']
+
+
+def test_without_password_token_is_kept():
+    now = time.time()
+    token = make_token(iat=now - 100, exp=now - 1)
+    manager = TokenManager('m1', token)
+
+    assert manager.get() == token
+    assert manager.expired()
+    assert manager.refresh(token) is None
+
+
+# Function to build an API helper that rejects every token but `accepted` with a 401
+def fake_helper(accepted, sent):
+    def helper(first, jwt_token, *args):
+        sent.append(jwt_token)
+        if jwt_token != accepted[0]:
+            return {'success': False, 'status_code': 401, 'message': 'Unauthorized'}
+        return {'success': True}
+    return helper
+
+
+# Function to replace the login call with one whose new token becomes the only accepted one
+def accepting_login(monkeypatch, accepted, calls, delay=0.0):
+    def login_api_call(mobile, password):
+        calls.append(mobile)
+        time.sleep(delay)
+        now = time.time()
+        accepted[0] = make_token(iat=now, exp=now + 3600, n=len(calls))
+        return {'jwt_token': accepted[0]}
+    monkeypatch.setattr(tokens, 'login_api_call', login_api_call)
+
+
+def test_wrap_renews_and_retries_once_after_401(monkeypatch):
+    calls, sent, accepted = [], [], [None]
+    accepting_login(monkeypatch, accepted, calls)
+    now = time.time()
+    old_token = make_token(iat=now, exp=now + 3600)
+    manager = TokenManager('m1', old_token, 'secret')
+
+    assert manager.wrap(fake_helper(accepted, sent))('dev-1', old_token) == {'success': True}
+    assert calls == ['m1']
+    assert sent == [old_token, accepted[0]]
+
+
+def test_wrap_async_renews_and_retries_once_after_401(monkeypatch):
+    calls, sent, accepted = [], [], [None]
+    accepting_login(monkeypatch, accepted, calls)
+    now = time.time()
+    old_token = make_token(iat=now, exp=now + 3600)
+    manager = TokenManager('m1', old_token, 'secret')
+    helper = fake_helper(accepted, sent)
+
+    async def async_helper(first, jwt_token, *args):
+        return helper(first, jwt_token, *args)
+
+    assert asyncio.run(manager.wrap_async(async_helper)('dev-1', old_token)) == {'success': True}
+    assert calls == ['m1']
+    assert sent == [old_token, accepted[0]]
+
+
+def test_wrap_without_password_does_not_retry():
+    sent = []
+    now = time.time()
+    token = make_token(iat=now, exp=now + 3600)
+    manager = TokenManager('m1', token)
+
+    response = manager.wrap(fake_helper([None], sent))('dev-1', token)
+
+    assert tokens.is_unauthorized(response)
+    assert sent == [token]
+
+
+def test_concurrent_401s_share_one_login(monkeypatch):
+    calls, sent, accepted = [], [], [None]
+    accepting_login(monkeypatch, accepted, calls, delay=0.05)
+    now = time.time()
+    old_token = make_token(iat=now, exp=now + 3600)
+    manager = TokenManager('m1', old_token, 'secret')
+    barrier = threading.Barrier(8)
+
+    helper = fake_helper(accepted, sent)
+
+    def rejected_together(first, jwt_token):
+        response = helper(first, jwt_token)
+        if tokens.is_unauthorized(response):
+            barrier.wait()  # Every first attempt is rejected before anyone renews
+        return response
+
+    call = manager.wrap(rejected_together)
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(lambda i: call(f'dev-{i}', old_token), range(8)))
+
+    assert results == [{'success': True}] * 8
+    assert calls == ['m1']
+
+
+def test_failed_renewal_backoff_survives_repeated_401s(monkeypatch):
+    calls, sent = [], []
+    monkeypatch.setattr(tokens, 'login_api_call',
+                        lambda mobile, password: calls.append(mobile) or {'success': False, 'message': 'Invalid password'})
+    now = time.time()
+    token = make_token(iat=now, exp=now + 3600)
+    manager = TokenManager('m1', token, 'wrong')
+    call = manager.wrap(fake_helper([None], sent))
+
+    for i in range(20):
+        assert tokens.is_unauthorized(call(f'dev-{i}', token))
+
+    assert calls == ['m1']
+    assert manager.last_error == 'Invalid password'